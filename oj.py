@@ -5,15 +5,123 @@
 支持多个测试用例、多种语言、跨平台运行
 """
 
+import io
 import os
 import sys
 import json
+import socket
+import struct
+from typing import List, Dict, Tuple, Optional
+
+# 常驻评测服务（见 OJDaemon）的套接字和数据帧格式：帧头为 (类型, 长度)，退出帧中长度字段为退出码
+# 套接字放在 oj.py 所在目录下，在任何工作目录运行的客户端都能找到同一个服务
+DAEMON_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".oj", "daemon.sock")
+DAEMON_FRAME = struct.Struct('<BI')
+DAEMON_STDOUT, DAEMON_STDERR, DAEMON_EXIT, DAEMON_REJECT = 1, 2, 3, 4
+# 总是在本地执行的选项；监视模式需要随客户端的 Ctrl+C 结束
+DAEMON_LOCAL_OPTIONS = ("--daemon", "--stop-daemon", "--no-daemon", "--watch")
+
+def script_version() -> List[int]:
+    """oj.py 的 (修改时间, 大小)，客户端与评测服务不一致时改为在本地运行"""
+    stat = os.stat(os.path.abspath(__file__))
+    return [stat.st_mtime_ns, stat.st_size]
+
+def connect_daemon() -> Optional[socket.socket]:
+    """连接评测服务，服务未运行时返回 None"""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(DAEMON_SOCKET):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(DAEMON_SOCKET)
+    except OSError:
+        connection.close()
+        return None
+    return connection
+
+def runs_locally(argv: List[str]) -> bool:
+    """命令是否必须在本地执行（长选项可能是缩写，短选项可能合写，判断时从宽）"""
+    for arg in argv:
+        if arg.startswith("--") and len(arg) > 2:
+            name = arg.split("=", 1)[0]
+            if any(option.startswith(name) for option in DAEMON_LOCAL_OPTIONS):
+                return True
+        elif arg.startswith("-") and "w" in arg:
+            return True
+    return False
+
+def forward_to_daemon(argv: List[str]) -> Optional[int]:
+    """把命令转发给评测服务并输出其结果，返回退出码；服务未运行或拒绝请求时返回 None"""
+    connection = connect_daemon()
+    if connection is None:
+        return None
+    with connection:
+        request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ), "version": script_version()}
+        connection.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        reader = connection.makefile('rb')
+        while True:
+            header = reader.read(DAEMON_FRAME.size)
+            if len(header) < DAEMON_FRAME.size:
+                print("✗ 评测服务连接中断", file=sys.stderr)
+                return 1
+            kind, length = DAEMON_FRAME.unpack(header)
+            if kind == DAEMON_EXIT:
+                return length
+            if kind == DAEMON_REJECT:
+                print("⚠ 评测服务的 oj.py 版本与当前不一致，本次在本地运行（请重启评测服务）", file=sys.stderr)
+                return None
+            stream = sys.stdout if kind == DAEMON_STDOUT else sys.stderr
+            # 每帧是一次完整的写入，可以单独解码
+            stream.write(reader.read(length).decode('utf-8', errors='replace'))
+            stream.flush()
+
+# 评测服务运行时在导入其余模块之前直接转发命令，客户端只需解释器启动的时间
+if __name__ == "__main__" and not runs_locally(sys.argv[1:]):
+    try:
+        _daemon_exit_code = forward_to_daemon(sys.argv[1:])
+    except KeyboardInterrupt:
+        # 断开连接后评测服务在下一次输出时结束该命令
+        _daemon_exit_code = 130
+    if _daemon_exit_code is not None:
+        sys.exit(_daemon_exit_code)
+
+import asyncio
+import codecs
+import shutil
+import hashlib
+import tempfile
+import threading
+import contextlib
+import traceback
+import atexit
 import subprocess
 import time
 import argparse
+import signal
 import platform
+import unicodedata
+import mmap
+import array
+import itertools
+import math
+import statistics
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+
+try:
+    import resource  # 仅 POSIX 系统可用
+except ImportError:
+    resource = None
+
+try:
+    import sqlite3  # 部分精简的 Python 发行版不带 sqlite3
+except ImportError:
+    sqlite3 = None
+
+try:
+    import zlib  # 测试包压缩（可选）
+except ImportError:
+    zlib = None
 
 class Colors:
     """ANSI颜色代码"""
@@ -35,13 +143,1929 @@ class Colors:
         Colors.PURPLE = Colors.CYAN = Colors.WHITE = Colors.BOLD = ''
         Colors.UNDERLINE = Colors.END = ''
 
+def pad_display(text: str, width: int, align: str = "<") -> str:
+    """按终端显示宽度填充字符串（中文字符占两列）"""
+    display_width = sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+    padding = " " * max(width - display_width, 0)
+    return padding + text if align == ">" else text + padding
+
+class Verdict:
+    """评测结果"""
+    AC = 'AC'    # 通过
+    WA = 'WA'    # 输出不匹配
+    RE = 'RE'    # 运行时错误
+    TLE = 'TLE'  # 超时
+    MLE = 'MLE'  # 内存超限
+    OLE = 'OLE'  # 输出超限
+
+# 子进程在新的进程组中运行，结束时连同其派生的进程（wsl、java 启动器、编译器各阶段等）一起结束
+PROCESS_GROUP_OPTIONS = {'start_new_session': True} if os.name == 'posix' else \
+    {'creationflags': getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)}
+
+class Cgroup:
+    """单次运行所在的 cgroup（见 CgroupSandbox）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.procs_file = str(path / "cgroup.procs")
+        self.usage = None
+
+    def add(self, pid: int):
+        """把已启动的进程移入 cgroup"""
+        CgroupSandbox.write(Path(self.procs_file), str(pid))
+
+    def kill(self):
+        """结束 cgroup 中的所有进程（包括脱离了进程组的后代进程）"""
+        try:
+            CgroupSandbox.write(self.path / "cgroup.kill", "1")
+            return
+        except OSError:
+            pass  # 内核早于 5.14 时没有 cgroup.kill
+        try:
+            pids = (self.path / "cgroup.procs").read_text().split()
+        except OSError:
+            return
+        for pid in pids:
+            try:
+                os.kill(int(pid), signal.SIGKILL)
+            except OSError:
+                pass
+
+    def read_stat(self, name: str) -> Dict[str, int]:
+        try:
+            lines = (self.path / name).read_text().splitlines()
+        except OSError:
+            return {}
+        return {key: int(value) for key, value in (line.split() for line in lines if line.count(' ') == 1)}
+
+    def finish(self) -> Tuple[Optional[float], Optional[int], bool, bool]:
+        """主进程退出后结束残留进程、读取用量并删除 cgroup
+
+        返回 (CPU时间(秒), 峰值内存(字节), 是否因内存超限被结束, 是否达到进程数上限)；
+        CPU 时间和峰值内存包含所有后代进程，读取失败时为 None。可重复调用。
+        """
+        if self.usage is not None:
+            return self.usage
+        self.kill()
+        usage_usec = self.read_stat("cpu.stat").get("usage_usec")
+        try:
+            peak_memory = int((self.path / "memory.peak").read_text())  # 内核 5.19+
+        except (OSError, ValueError):
+            peak_memory = None
+        oom_killed = self.read_stat("memory.events").get("oom_kill", 0) > 0
+        pids_exceeded = self.read_stat("pids.events").get("max", 0) > 0
+        self.usage = (usage_usec / 1e6 if usage_usec is not None else None, peak_memory, oom_killed, pids_exceeded)
+        CgroupSandbox.remove(self.path)
+        return self.usage
+
+class CgroupSandbox:
+    """cgroup v2 资源隔离（仅 Linux）
+
+    每次运行放在评测器所在 cgroup 下的 oj-<pid>/run-<pid>-<n> 中，用 cpu.max 限制 CPU 配额、
+    memory.max 限制内存、pids.max 限制进程(线程)数；CPU 时间、峰值内存和是否因内存超限被结束
+    都取自 cgroup 的统计文件。评测器所在的 cgroup 中只有评测器自己但尚未向子 cgroup 开放控制器时，
+    先把评测器移到叶子 cgroup oj-<pid>-judge 中（有进程的非根 cgroup 不能开放控制器），
+    退出时再移回原来的 cgroup 并恢复其控制器设置。
+    """
+
+    CONTROLLERS = ("cpu", "memory", "pids")
+    # 每次运行的 CPU 配额（周期内可用的微秒数，即 1 个核心）和进程(线程)数上限
+    CPU_PERIOD = 100000
+    CPU_QUOTA = 100000
+    PIDS_MAX = 128
+
+    def __init__(self, root: Path, judge: Optional[Path] = None):
+        self.root = root
+        # 评测器为开放控制器而移入的叶子 cgroup，None 表示没有移动
+        self.judge = judge
+        self.owner = os.getpid()
+        self.lock = threading.Lock()
+        self.next_id = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def write(path: Path, text: str):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    @staticmethod
+    def remove(path: Path, timeout: float = 1.0):
+        """删除 cgroup（先删除子 cgroup）；被结束的进程需要片刻才会离开 cgroup，期间重试"""
+        with contextlib.suppress(OSError):
+            for child in path.iterdir():
+                if child.is_dir():
+                    CgroupSandbox.remove(child, timeout)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                path.rmdir()
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    return
+                time.sleep(0.001)
+
+    @staticmethod
+    def process_exists(pid: int) -> bool:
+        """进程是否存在（没有权限向其发送信号时也视为存在）"""
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    @staticmethod
+    def current_cgroup() -> Path:
+        """评测器所在的 cgroup v2 目录"""
+        relative = None
+        with open("/proc/self/cgroup") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    relative = line[3:].strip()
+        if relative is None:
+            raise OSError("系统未使用 cgroup v2")
+        with open("/proc/self/mountinfo") as f:
+            for line in f:
+                fields, _, rest = line.partition(" - ")
+                fields = fields.split()
+                if rest.split()[0] == "cgroup2" and relative.startswith(fields[3]):
+                    return Path(fields[4]) / relative[len(fields[3]):].lstrip("/")
+        raise OSError("没有找到 cgroup v2 挂载点")
+
+    @classmethod
+    def setup(cls) -> 'CgroupSandbox':
+        """创建评测用的 cgroup，不可用时抛出 OSError（说明原因）"""
+        if not sys.platform.startswith("linux"):
+            raise OSError("仅 Linux 支持 cgroup")
+        base = cls.current_cgroup()
+        missing = set(cls.CONTROLLERS) - set((base / "cgroup.controllers").read_text().split())
+        if missing:
+            raise OSError(f"cgroup {base} 没有可用的控制器: {', '.join(sorted(missing))}")
+        # 清理异常退出的评测器遗留的 cgroup（oj-<pid> 中的评测器进程已不存在时才清理）
+        for stale in base.glob("oj-*"):
+            owner = stale.name[3:].split("-")[0]
+            if owner.isdigit() and int(owner) != os.getpid() and not cls.process_exists(int(owner)):
+                cls.remove(stale, timeout=0)
+        enable = " ".join(f"+{name}" for name in cls.CONTROLLERS)
+        judge = None
+        try:
+            cls.write(base / "cgroup.subtree_control", enable)
+        except OSError:
+            if (base / "cgroup.procs").read_text().split() != [str(os.getpid())]:
+                raise OSError(f"没有 cgroup {base} 的管理权限（可用 systemd-run --scope -p Delegate=yes 运行）")
+            judge = base / f"oj-{os.getpid()}-judge"
+            judge.mkdir(exist_ok=True)
+            try:
+                cls.write(judge / "cgroup.procs", "0")
+                cls.write(base / "cgroup.subtree_control", enable)
+            except OSError:
+                cls.leave_judge_cgroup(judge)
+                raise
+        root = base / f"oj-{os.getpid()}"
+        root.mkdir(exist_ok=True)
+        try:
+            cls.write(root / "cgroup.subtree_control", enable)
+        except OSError:
+            cls.remove(root)
+            if judge is not None:
+                cls.leave_judge_cgroup(judge)
+            raise
+        sandbox = cls(root, judge)
+        atexit.register(sandbox.close)
+        return sandbox
+
+    def create(self, memory_limit: int = 0) -> Cgroup:
+        """为一次运行创建 cgroup，memory_limit 为内存上限(字节)，0 表示不限制"""
+        with self.lock:
+            self.next_id += 1
+            path = self.root / f"run-{os.getpid()}-{self.next_id}"
+        path.mkdir()
+        try:
+            self.write(path / "cpu.max", f"{self.CPU_QUOTA} {self.CPU_PERIOD}")
+            self.write(path / "pids.max", str(self.PIDS_MAX))
+            if memory_limit:
+                self.write(path / "memory.max", str(memory_limit))
+                # 超出时直接结束整个 cgroup，而不是换出到交换区拖慢评测
+                with contextlib.suppress(OSError):
+                    self.write(path / "memory.swap.max", "0")
+                with contextlib.suppress(OSError):
+                    self.write(path / "memory.oom.group", "1")
+        except OSError:
+            self.remove(path)
+            raise
+        return Cgroup(path)
+
+    @classmethod
+    def leave_judge_cgroup(cls, judge: Path):
+        """把评测器（及仍在叶子 cgroup 中的子进程）移回原来的 cgroup，关闭为此开放的控制器并删除叶子 cgroup"""
+        base = judge.parent
+        # 开放了控制器的非根 cgroup 中不能有进程，先恢复原来的设置（此时评测用的子 cgroup 已删除）
+        with contextlib.suppress(OSError):
+            cls.write(base / "cgroup.subtree_control", " ".join(f"-{name}" for name in cls.CONTROLLERS))
+        with contextlib.suppress(OSError):
+            for pid in (judge / "cgroup.procs").read_text().split():
+                with contextlib.suppress(OSError):
+                    cls.write(base / "cgroup.procs", pid)
+        cls.remove(judge)
+
+    def close(self):
+        """评测器退出时删除所有 cgroup，移入过叶子 cgroup 时移回原来的 cgroup"""
+        if os.getpid() == self.owner:
+            for run in self.root.glob("run-*"):
+                Cgroup(run).kill()
+            self.remove(self.root)
+            if self.judge is not None:
+                self.leave_judge_cgroup(self.judge)
+
+def parse_cpu_list(text: str) -> List[int]:
+    """解析内核的 CPU 列表格式，如 0-3,8"""
+    cpus = []
+    for part in text.strip().split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+class CpuScheduler:
+    """CPU 绑定调度器（仅 Linux）
+
+    每个物理核心只选一个逻辑 CPU（同一核心的超线程兄弟不会同时分配），被评测程序运行期间独占其中一个，
+    避免进程在核心间迁移、与其他用例共享超线程带来的计时抖动。reserve_core 时第一个核心留给评测器自身
+    （评测器的所有线程固定在该核心上，编译器等不需要独占核心的子进程使用其余 CPU）。
+    """
+
+    def __init__(self, reserve_core: bool = False):
+        allowed = os.sched_getaffinity(0)
+        cores = {}
+        for cpu in sorted(allowed):
+            try:
+                with open(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list") as f:
+                    siblings = frozenset(parse_cpu_list(f.read()))
+            except (OSError, ValueError):
+                siblings = frozenset([cpu])
+            cores.setdefault(siblings, cpu)
+        self.cpus = sorted(cores.values())
+        self.judge_cpu = None
+        # 不独占核心的子进程可用的 CPU
+        self.shared_cpus = set(allowed)
+        if reserve_core and len(self.cpus) > 1:
+            self.judge_cpu = self.cpus.pop(0)
+            judge_siblings = next(siblings for siblings, cpu in cores.items() if cpu == self.judge_cpu)
+            self.shared_cpus -= judge_siblings
+            self.pin_current_process({self.judge_cpu})
+        self.free = list(self.cpus)
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def pin_current_process(cpus):
+        """把当前进程的所有线程固定到指定 CPU（之后创建的线程继承该设置）"""
+        for tid in os.listdir("/proc/self/task"):
+            try:
+                os.sched_setaffinity(int(tid), cpus)
+            except OSError:
+                pass
+
+    def acquire(self, blocking: bool = True) -> Optional[int]:
+        """独占一个 CPU；没有空闲 CPU 且 blocking 为 False 时返回 None"""
+        with self.condition:
+            while not self.free:
+                if not blocking:
+                    return None
+                self.condition.wait()
+            return self.free.pop(0)
+
+    def release(self, cpu: int):
+        with self.condition:
+            self.free.append(cpu)
+            self.condition.notify()
+
+class RunningProcess:
+    """被评测的子进程：统一结束进程、等待退出并收集资源使用情况
+
+    POSIX 系统通过 wait4 获取子进程自身的 CPU 时间和峰值内存(RSS)，
+    Windows 下通过进程句柄查询；结束进程与回收进程互斥，避免误杀被复用的 PID。
+    Linux 的 ru_maxrss 包含 exec 之前从评测进程继承的内存（很小的程序也会显示约等于评测进程的占用），
+    因此不使用：在 cgroup 中运行时改用 cgroup 的统计（包含所有后代进程，退出后结束残留的后代进程），
+    否则由 MemoryLauncher 通过 usage_pipe 回报程序自身的用量，两者都没有时峰值内存为 None。
+    """
+
+    def __init__(self, popen: subprocess.Popen, cgroup: Optional[Cgroup] = None,
+                 usage_pipe: Optional[int] = None):
+        self.popen = popen
+        self.usage_pipe = usage_pipe
+        self.stdin = popen.stdin
+        self.stdout = popen.stdout
+        self.stderr = popen.stderr
+        self.lock = threading.Lock()
+        self.returncode = None
+        self.cgroup = cgroup
+        # 因内存超限被 OOM killer 结束 / 创建进程数达到上限（仅在 cgroup 中运行时可知）
+        self.oom_killed = False
+        self.pids_exceeded = False
+
+    def kill(self):
+        """立即结束进程及其所在的进程组（已退出时忽略）"""
+        with self.lock:
+            if self.returncode is not None:
+                return
+            try:
+                if os.name == 'posix':
+                    # 进程回收前进程组 ID 不会被复用；不是组长时退回只结束进程本身
+                    try:
+                        os.killpg(self.popen.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        os.kill(self.popen.pid, signal.SIGKILL)
+                else:
+                    subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.popen.pid)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    self.popen.kill()
+            except OSError:
+                pass
+            if self.cgroup is not None:
+                self.cgroup.kill()
+
+    def has_exited(self) -> bool:
+        """进程是否已退出（不回收进程，之后仍需调用 wait）"""
+        if os.name == 'posix' and hasattr(os, 'waitid'):
+            try:
+                return os.waitid(os.P_PID, self.popen.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+            except ChildProcessError:
+                return True
+        return os.name != 'posix' and self.popen.poll() is not None
+
+    def wait(self) -> Tuple[int, Optional[float], Optional[int]]:
+        """等待进程退出，返回 (退出码, CPU时间(秒), 峰值内存(字节))"""
+        if os.name == 'posix':
+            _, status, usage = os.wait4(self.popen.pid, 0)
+            if os.WIFSIGNALED(status):
+                returncode = -os.WTERMSIG(status)
+            else:
+                returncode = os.WEXITSTATUS(status)
+            with self.lock:
+                self.returncode = self.popen.returncode = returncode
+            # ru_maxrss 在 Linux 上以KB为单位，在 macOS 上以字节为单位
+            peak_memory = usage.ru_maxrss if sys.platform == 'darwin' else None
+            cpu_time = usage.ru_utime + usage.ru_stime
+            if self.usage_pipe is not None:
+                report = MemoryLauncher.read_report(self.usage_pipe)
+                self.usage_pipe = None
+                if report is not None:
+                    cpu_time, peak_memory = report
+            if self.cgroup is not None:
+                cgroup_cpu, cgroup_memory, self.oom_killed, self.pids_exceeded = self.cgroup.finish()
+                cpu_time = cgroup_cpu if cgroup_cpu is not None else cpu_time
+                peak_memory = cgroup_memory if cgroup_memory is not None else peak_memory
+            return returncode, cpu_time, peak_memory
+
+        returncode = self.popen.wait()
+        with self.lock:
+            self.returncode = returncode
+        cpu_time, peak_memory = windows_process_usage(self.popen)
+        return returncode, cpu_time, peak_memory
+
+class MemoryLauncher:
+    """测量峰值内存的启动器（Linux）
+
+    fork 后 exec 的程序的 ru_maxrss 包含 exec 前从父进程继承的内存，评测器本身占用数十MB，
+    会使很小的程序也被判为内存超限。启动器是一个很小的 C 程序：评测器启动它，再由它 fork 并 exec
+    被评测程序，子进程继承的只有启动器自身不到 1MB 的内存。被评测程序退出后，启动器把它的
+    CPU 时间和峰值内存写入评测器传来的文件描述符，然后以相同的退出码或信号退出。
+    """
+
+    NAME = "oj_launcher"
+
+    SOURCE = r'''
+#include <errno.h>
+#include <fcntl.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+/* 用法: oj_launcher <回报用的文件描述符> <程序> [参数...] */
+int main(int argc, char **argv) {
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s <fd> <program> [args...]\n", argv[0]);
+        return 127;
+    }
+    int report = atoi(argv[1]);
+    fcntl(report, F_SETFD, FD_CLOEXEC);
+    pid_t pid = fork();
+    if (pid < 0) {
+        perror("fork");
+        return 127;
+    }
+    if (pid == 0) {
+        execvp(argv[2], argv + 2);
+        perror(argv[2]);
+        _exit(127);
+    }
+    int status;
+    struct rusage usage;
+    while (wait4(pid, &status, 0, &usage) < 0) {
+        if (errno != EINTR) {
+            return 127;
+        }
+    }
+    dprintf(report, "%ld.%06ld %ld.%06ld %ld\n",
+            (long)usage.ru_utime.tv_sec, (long)usage.ru_utime.tv_usec,
+            (long)usage.ru_stime.tv_sec, (long)usage.ru_stime.tv_usec, usage.ru_maxrss);
+    close(report);
+    if (WIFSIGNALED(status)) {
+        /* 以相同的信号退出（不产生 core 文件），评测器看到的退出状态与直接运行时一致 */
+        struct rlimit no_core = {0, 0};
+        setrlimit(RLIMIT_CORE, &no_core);
+        signal(WTERMSIG(status), SIG_DFL);
+        raise(WTERMSIG(status));
+    }
+    return WEXITSTATUS(status);
+}
+'''
+
+    @staticmethod
+    def read_report(fd: int) -> Optional[Tuple[float, int]]:
+        """读取启动器回报的 (CPU时间(秒), 峰值内存(字节)) 并关闭描述符；
+        启动器被结束（超时、提前结束）而没有回报时返回 None"""
+        try:
+            data = b''
+            while True:
+                chunk = os.read(fd, 256)
+                if not chunk:
+                    break
+                data += chunk
+        except OSError:
+            data = b''
+        finally:
+            os.close(fd)
+        try:
+            user, system, maxrss = data.split()
+            return float(user) + float(system), int(maxrss) * 1024
+        except ValueError:
+            return None
+
+class PythonForkServer:
+    """Python 预热执行器（fork server）
+
+    常驻一个已完成启动和常用模块导入的 Python 解释器进程，每个测试用例由它 fork
+    出一个新的子进程，把标准输入输出重定向到评测器传来的文件描述符后以 __main__
+    身份运行 main.py。每个用例仍在独立进程中运行，但省去了解释器启动的开销。
+    评测器与服务进程通过 Unix 套接字通信（SCM_RIGHTS 传递文件描述符），仅支持 POSIX 系统。
+    """
+
+    SERVER_SOURCE = r'''
+import os, sys, json, array, select, signal, socket, runpy, traceback
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 预先导入常用模块，子进程直接继承
+for _name in ("collections", "heapq", "bisect", "math", "itertools", "functools", "operator",
+              "re", "string", "random", "io", "copy", "array", "decimal", "fractions", "typing"):
+    try:
+        __import__(_name)
+    except ImportError:
+        pass
+
+sock = socket.socket(fileno=int(sys.argv[1]))
+parent_pid = os.getppid()
+wakeup_r, wakeup_w = os.pipe()
+os.set_blocking(wakeup_w, False)
+signal.set_wakeup_fd(wakeup_w)
+signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+children = {}
+sock.send(json.dumps({"ready": True}).encode("utf-8"))
+
+
+def run_child(request, fds):
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.set_wakeup_fd(-1)
+    sock.close()
+    os.close(wakeup_r)
+    os.close(wakeup_w)
+    os.setpgid(0, 0)
+    if request.get("cpus"):
+        os.sched_setaffinity(0, request["cpus"])
+    if request.get("cgroup"):
+        try:
+            with open(request["cgroup"], "w") as f:
+                f.write("0")
+        except OSError as e:
+            os.write(fds[2], ("cannot join cgroup: %s\n" % e).encode())
+            os._exit(126)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    for fd in fds:
+        if fd > 2:
+            os.close(fd)
+    if resource is not None:
+        if request.get("cpu_limit"):
+            resource.setrlimit(resource.RLIMIT_CPU, (request["cpu_limit"], request["cpu_limit"] + 1))
+        if request.get("address_limit"):
+            resource.setrlimit(resource.RLIMIT_AS, (request["address_limit"], request["address_limit"]))
+    script = request["script"]
+    sys.argv = [script] + request.get("args", [])
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    code = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            sys.stderr.write(str(e.code) + "\n")
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            code = code or 1
+    os._exit(code & 0xFF)
+
+
+while True:
+    try:
+        readable, _, _ = select.select([sock, wakeup_r], [], [], 1.0)
+    except InterruptedError:
+        continue
+    if os.getppid() != parent_pid:
+        break
+    if sock in readable:
+        message, ancdata, _, _ = sock.recvmsg(65536, socket.CMSG_LEN(3 * array.array("i").itemsize))
+        if not message:
+            break
+        fds = array.array("i")
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(data[:len(data) - len(data) % fds.itemsize])
+        request = json.loads(message.decode("utf-8"))
+        pid = os.fork()
+        if pid == 0:
+            run_child(request, list(fds))
+        for fd in fds:
+            os.close(fd)
+        children[pid] = request["id"]
+        sock.send(json.dumps({"id": request["id"], "pid": pid}).encode("utf-8"))
+    if wakeup_r in readable:
+        try:
+            os.read(wakeup_r, 4096)
+        except BlockingIOError:
+            pass
+    while children:
+        try:
+            pid, status, usage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            break
+        request_id = children.pop(pid, None)
+        if request_id is None:
+            continue
+        returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        sock.send(json.dumps({"id": request_id, "returncode": returncode,
+                              "cpu_time": usage.ru_utime + usage.ru_stime,
+                              "maxrss": usage.ru_maxrss}).encode("utf-8"))
+'''
+
+    def __init__(self, python: str):
+        try:
+            self.sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        except (AttributeError, OSError):
+            self.sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self.process = subprocess.Popen(
+                [python, "-c", self.SERVER_SOURCE, str(server_sock.fileno())],
+                pass_fds=[server_sock.fileno()],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL
+            )
+        finally:
+            server_sock.close()
+        # 等待服务进程完成启动和模块预加载，避免把这段时间算进第一个用例
+        self.sock.settimeout(10)
+        try:
+            ready = self.sock.recv(65536)
+        except OSError:
+            ready = b''
+        finally:
+            self.sock.settimeout(None)
+        if not ready:
+            self.close()
+            raise OSError("预热执行器启动失败")
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.next_id = itertools.count(1)
+        self.reader = threading.Thread(target=self.dispatch_replies, daemon=True)
+        self.reader.start()
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def dispatch_replies(self):
+        """接收服务进程的回复（子进程已启动/已退出），转交给对应的进程对象"""
+        while True:
+            try:
+                message = self.sock.recv(65536)
+            except OSError:
+                message = b''
+            if not message:
+                break
+            reply = json.loads(message.decode('utf-8'))
+            with self.lock:
+                child = self.pending.get(reply['id'])
+                if child is not None and 'returncode' in reply:
+                    del self.pending[reply['id']]
+            if child is not None:
+                child.handle_reply(reply)
+        # 服务进程已退出，所有未完成的子进程按异常结束处理
+        with self.lock:
+            orphans = list(self.pending.values())
+            self.pending.clear()
+        for child in orphans:
+            child.handle_reply({'returncode': -signal.SIGKILL})
+
+    def spawn(self, script: Path, stdin_fd: int, stdout_fd: int, stderr_fd: int,
+              cpu_limit: int = 0, address_limit: int = 0, args: List[str] = (),
+              cgroup: Optional[Cgroup] = None, cpus=None) -> 'ForkServerProcess':
+        """请求服务进程运行脚本，返回对应的进程对象
+
+        args 为命令行参数，cgroup 为子进程加入的 cgroup，cpus 为子进程绑定的 CPU 集合。
+        """
+        request_id = next(self.next_id)
+        child = ForkServerProcess(self, cgroup)
+        with self.lock:
+            self.pending[request_id] = child
+        request = {"id": request_id, "script": str(script), "args": list(args),
+                   "cpu_limit": cpu_limit, "address_limit": address_limit,
+                   "cgroup": cgroup.procs_file if cgroup is not None else None,
+                   "cpus": sorted(cpus) if cpus else None}
+        fds = array.array('i', [stdin_fd, stdout_fd, stderr_fd])
+        try:
+            self.sock.sendmsg([json.dumps(request).encode('utf-8')],
+                              [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds.tobytes())])
+            if not child.started.wait(5) or child.pid is None:
+                raise OSError("预热执行器没有响应")
+        except OSError:
+            with self.lock:
+                self.pending.pop(request_id, None)
+            raise
+        return child
+
+    def close(self):
+        """关闭服务进程"""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+class ForkServerProcess:
+    """由 PythonForkServer fork 出的子进程，接口与 RunningProcess 相同"""
+
+    def __init__(self, server: PythonForkServer, cgroup: Optional[Cgroup] = None):
+        self.server = server
+        self.stdin = self.stdout = self.stderr = None
+        self.lock = threading.Lock()
+        self.pid = None
+        self.returncode = None
+        self.cpu_time = None
+        self.peak_memory = None
+        self.cgroup = cgroup
+        self.oom_killed = False
+        self.pids_exceeded = False
+        self.started = threading.Event()
+        self.exited = threading.Event()
+
+    def handle_reply(self, reply: Dict):
+        if 'pid' in reply:
+            self.pid = reply['pid']
+            self.started.set()
+        if 'returncode' in reply:
+            with self.lock:
+                self.returncode = reply['returncode']
+            self.cpu_time = reply.get('cpu_time')
+            maxrss = reply.get('maxrss')
+            if maxrss is not None:
+                self.peak_memory = maxrss if sys.platform == 'darwin' else maxrss * 1024
+            self.started.set()
+            self.exited.set()
+
+    def kill(self):
+        """立即结束进程及其所在的进程组（已退出时忽略）"""
+        with self.lock:
+            if self.returncode is not None or self.pid is None:
+                return
+            try:
+                # 子进程 fork 后立即成为进程组组长，尚未设置时退回只结束进程本身
+                try:
+                    os.killpg(self.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    os.kill(self.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            if self.cgroup is not None:
+                self.cgroup.kill()
+
+    def has_exited(self) -> bool:
+        """进程是否已退出"""
+        return self.exited.is_set()
+
+    def wait(self) -> Tuple[int, Optional[float], Optional[int]]:
+        """等待进程退出，返回 (退出码, CPU时间(秒), 峰值内存(字节))"""
+        self.exited.wait()
+        if self.cgroup is not None:
+            cpu_time, peak_memory, self.oom_killed, self.pids_exceeded = self.cgroup.finish()
+            if cpu_time is not None:
+                self.cpu_time = cpu_time
+            if peak_memory is not None:
+                self.peak_memory = peak_memory
+        return self.returncode, self.cpu_time, self.peak_memory
+
+class TailBuffer:
+    """只保留最后 limit 字节的环形缓冲区，用于收集可能无限增长的标准错误"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks = deque()
+        self.size = 0
+        # 已丢弃的字节数
+        self.dropped = 0
+
+    def append(self, data: bytes):
+        if len(data) >= self.limit:
+            self.dropped += self.size + len(data) - self.limit
+            self.chunks.clear()
+            data = data[-self.limit:]
+            self.size = 0
+        self.chunks.append(data)
+        self.size += len(data)
+        while self.size - len(self.chunks[0]) >= self.limit:
+            removed = len(self.chunks.popleft())
+            self.size -= removed
+            self.dropped += removed
+
+    def getvalue(self) -> bytes:
+        """最后 limit 字节的内容"""
+        data = b''.join(self.chunks)
+        if len(data) > self.limit:
+            self.dropped += len(data) - self.limit
+            data = data[-self.limit:]
+        self.chunks = deque([data])
+        self.size = len(data)
+        return data
+
+    def text(self) -> str:
+        """解码后的内容，有数据被丢弃时在开头注明"""
+        data = self.getvalue().decode('utf-8', errors='replace')
+        return f"...(前 {self.dropped} 字节已省略)\n{data}" if self.dropped else data
+
+class AsyncProcessRunner:
+    """基于 asyncio 的进程运行器
+
+    在一个事件循环中同时驱动多个进程：并发写入标准输入、读取标准输出和标准错误，
+    用信号量限制同时运行的进程数，超时时结束整个进程组。进程由调用方创建
+    （RunningProcess/ForkServerProcess），退出后仍通过其 wait() 收集 CPU 时间和峰值内存。
+    Windows 的匿名管道不能注册到事件循环，改为在线程池中读写。
+    """
+
+    # 读取管道的块大小（线程中读取时）
+    CHUNK_SIZE = 1024 * 1024
+    # 标准错误只保留最后的部分，足够显示编译器和程序的错误信息
+    STDERR_LIMIT = 1024 * 1024
+
+    def __init__(self, limit: int = 1):
+        self.limit = max(1, limit)
+        self.semaphore = None
+        self.executor = None
+
+    def run_all(self, coroutines) -> List:
+        """在新的事件循环中并发运行一组协程，按顺序返回结果"""
+        loop = asyncio.new_event_loop()
+        # 每个进程退出后用一个线程等待回收；Windows 上读写管道另需线程
+        self.executor = ThreadPoolExecutor(self.limit * (1 if os.name == 'posix' else 4))
+        try:
+            return loop.run_until_complete(self.gather(coroutines))
+        finally:
+            self.executor.shutdown()
+            loop.close()
+
+    async def gather(self, coroutines) -> List:
+        self.semaphore = asyncio.Semaphore(self.limit)
+        return await asyncio.gather(*coroutines)
+
+    async def run(self, spawn, input_data: Optional[bytes], timeout: float,
+                  output_limit: int = 0, stdout_file=None) -> Dict:
+        """启动并运行一个进程，返回结果字典: returncode, stdout（字节）, stderr（文本）, timed_out,
+        output_exceeded, time, cpu_time, memory
+
+        spawn() 创建进程，启动失败时的 OSError 原样抛出；input_data 为 None 表示标准输入已重定向到文件。
+        output_limit 为标准输出的上限(字节)，0 表示不限制，超过时立即结束进程并丢弃其余输出；
+        stdout_file 为二进制文件对象时标准输出边读取边写入该文件，不保留在内存中（结果中 stdout 为空）。
+        标准错误只保留最后 STDERR_LIMIT 字节。
+        """
+        async with self.semaphore:
+            loop = asyncio.get_event_loop()
+            start_time = time.perf_counter()
+            process = spawn()
+            timed_out = []
+            exceeded = []
+
+            def kill_on_timeout():
+                timed_out.append(True)
+                process.kill()
+
+            def kill_on_output_limit():
+                exceeded.append(True)
+                process.kill()
+
+            timer = loop.call_later(timeout, kill_on_timeout)
+            stdout_chunks = []
+            stderr = TailBuffer(self.STDERR_LIMIT)
+            try:
+                streams = [self.read_all(loop, process.stdout,
+                                         stdout_file.write if stdout_file is not None else stdout_chunks.append,
+                                         output_limit, kill_on_output_limit),
+                           self.read_all(loop, process.stderr, stderr.append)]
+                if process.stdin is not None:
+                    streams.append(self.write_all(loop, process.stdin, input_data or b''))
+                await asyncio.gather(*streams)
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                returncode, cpu_time, memory = await self.wait(loop, process)
+                timer.cancel()
+            return {'returncode': returncode, 'stdout': b''.join(stdout_chunks), 'stderr': stderr.text(),
+                    'timed_out': bool(timed_out), 'output_exceeded': bool(exceeded),
+                    'time': time.perf_counter() - start_time, 'cpu_time': cpu_time, 'memory': memory}
+
+    async def wait(self, loop, process) -> Tuple[int, Optional[float], Optional[int]]:
+        """等待进程退出并回收
+
+        输出管道关闭时进程通常已经退出，直接回收；否则 Linux 上通过 pidfd 在事件循环中等待，
+        其他情况占用一个线程等待。
+        """
+        pidfd = None
+        if not process.has_exited() and hasattr(os, 'pidfd_open') and isinstance(process, RunningProcess):
+            try:
+                pidfd = os.pidfd_open(process.popen.pid)
+            except OSError:
+                pass
+        if pidfd is not None:
+            exited = loop.create_future()
+            loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+        elif not process.has_exited():
+            return await loop.run_in_executor(self.executor, process.wait)
+        return process.wait()
+
+    class PipeCollector(asyncio.Protocol):
+        """把管道中的数据依次交给 write，管道关闭时完成 future
+
+        limit 非 0 时最多交出 limit 字节，超过时调用一次 on_limit，之后的数据直接丢弃（仍继续读取，
+        以免子进程阻塞在写管道上）。
+        """
+
+        def __init__(self, done: asyncio.Future, write, limit: int = 0, on_limit=None):
+            self.done = done
+            self.write = write
+            self.limit = limit
+            self.on_limit = on_limit
+            self.size = 0
+
+        def data_received(self, data: bytes):
+            if self.limit and self.size > self.limit:
+                return
+            self.size += len(data)
+            if self.limit and self.size > self.limit:
+                data = data[:len(data) - (self.size - self.limit)]
+                self.on_limit()
+            if data:
+                self.write(data)
+
+        def connection_lost(self, exc):
+            if not self.done.done():
+                self.done.set_result(None)
+
+    async def read_all(self, loop, pipe, write, limit: int = 0, on_limit=None):
+        """读取管道直到 EOF（数据交给 write，见 PipeCollector），读完后关闭管道"""
+        done = loop.create_future()
+        collector = self.PipeCollector(done, write, limit, on_limit)
+        if os.name != 'posix':
+            def drain():
+                try:
+                    for chunk in iter(lambda: pipe.read1(self.CHUNK_SIZE), b''):
+                        collector.data_received(chunk)
+                finally:
+                    pipe.close()
+            await loop.run_in_executor(self.executor, drain)
+            return
+        await loop.connect_read_pipe(lambda: collector, pipe)
+        await done
+
+    async def write_all(self, loop, pipe, data: bytes):
+        """写入全部数据后关闭管道（程序提前退出或被结束时忽略管道错误）"""
+        if os.name != 'posix':
+            def feed():
+                try:
+                    pipe.write(data)
+                except OSError:
+                    pass
+                finally:
+                    try:
+                        pipe.close()
+                    except OSError:
+                        pass
+            await loop.run_in_executor(self.executor, feed)
+            return
+        # 写不完的部分由传输对象在管道可写时继续写入，写完后自动关闭；管道断开时丢弃剩余数据
+        transport, _ = await loop.connect_write_pipe(asyncio.Protocol, pipe)
+        transport.write(data)
+        transport.close()
+
+def windows_process_usage(popen: subprocess.Popen) -> Tuple[Optional[float], Optional[int]]:
+    """通过进程句柄查询 Windows 进程的 CPU 时间和峰值内存"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        handle = wintypes.HANDLE(int(popen._handle))
+        creation, exit_time, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+        cpu_time = None
+        if ctypes.windll.kernel32.GetProcessTimes(handle, ctypes.byref(creation), ctypes.byref(exit_time),
+                                                  ctypes.byref(kernel), ctypes.byref(user)):
+            cpu_time = (kernel.value + user.value) / 1e7  # 100纳秒为单位
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        peak_memory = None
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            peak_memory = counters.PeakWorkingSetSize
+        return cpu_time, peak_memory
+    except Exception:
+        return None, None
+
+class CompilerDetector:
+    """编译器探测：按需、可并行执行，结果按 PATH 和编译器文件修改时间缓存到磁盘"""
+
+    CANDIDATES = {
+        'cpp': ['g++', 'clang++'],
+        'c': ['gcc', 'clang'],
+        'java': ['javac'],
+    }
+
+    WINDOWS_PATHS = {
+        'cpp': [
+            r"C:\mingw64\bin\g++.exe",
+            r"C:\Program Files\mingw-w64\x86_64-8.1.0-win32-seh-rt_v6-rev0\mingw64\bin\g++.exe",
+            r"C:\MinGW\bin\g++.exe"
+        ],
+        'c': [
+            r"C:\mingw64\bin\gcc.exe",
+            r"C:\Program Files\mingw-w64\x86_64-8.1.0-win32-seh-rt_v6-rev0\mingw64\bin\gcc.exe",
+            r"C:\MinGW\bin\gcc.exe"
+        ],
+    }
+
+    def __init__(self, cache_file: Path):
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def __getstate__(self):
+        # 随 OJTester 传给评测子进程时，锁不能被序列化
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def path_digest() -> str:
+        """当前 PATH 的摘要，PATH 变化后整个缓存失效"""
+        return hashlib.sha256(os.environ.get('PATH', '').encode('utf-8')).hexdigest()[:16]
+
+    def load_entries(self) -> Dict[str, Dict]:
+        """读取磁盘缓存（只读取一次）"""
+        if self.entries is None:
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.entries = data['entries'] if data.get('path') == self.path_digest() else {}
+            except (OSError, ValueError, KeyError, AttributeError):
+                self.entries = {}
+        return self.entries
+
+    def save_entries(self):
+        """原子写回磁盘缓存"""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".compilers-", dir=str(self.cache_file.parent))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'path': self.path_digest(), 'entries': self.entries}, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, str(self.cache_file))
+        except OSError:
+            pass
+
+    def probe(self, command: List[str], use_cache: bool = True) -> Optional[str]:
+        """执行版本查询命令（如 ['g++', '--version']），成功时返回其输出，否则返回 None"""
+        binary = command[0] if os.path.isabs(command[0]) else shutil.which(command[0])
+        if not binary or not os.path.exists(binary):
+            return None
+
+        key = None
+        if use_cache:
+            # 编译器被升级/替换后修改时间改变，缓存键随之改变（PATH 变化时整个缓存失效）
+            key = " ".join([binary, str(os.stat(binary).st_mtime_ns)] + command[1:])
+            with self.lock:
+                entry = self.load_entries().get(key)
+            if entry is not None:
+                return entry.get('output')
+
+        try:
+            result = subprocess.run(command,
+                                    capture_output=True,
+                                    text=True,
+                                    timeout=5,
+                                    encoding='utf-8',
+                                    errors='replace')
+            output = (result.stdout.strip() or result.stderr.strip()) if result.returncode == 0 else None
+        except (FileNotFoundError, PermissionError, subprocess.TimeoutExpired):
+            output = None
+
+        if key is not None:
+            with self.lock:
+                self.load_entries()[key] = {'output': output}
+                self.save_entries()
+        return output
+
+    def find(self, lang: str) -> Optional[str]:
+        """查找指定语言的编译器"""
+        if lang == 'python':
+            return sys.executable or 'python'
+
+        for compiler in self.CANDIDATES.get(lang, []):
+            if self.probe([compiler, '--version']) is not None:
+                return compiler
+
+        # Windows: 检查常用安装路径
+        if platform.system() == "Windows":
+            for path in self.WINDOWS_PATHS.get(lang, []):
+                if os.path.exists(path):
+                    return path
+
+        return None
+
+    def find_all(self, langs: List[str]) -> Dict[str, Optional[str]]:
+        """并行查找多种语言的编译器"""
+        with ThreadPoolExecutor(max_workers=max(len(langs), 1)) as executor:
+            return dict(zip(langs, executor.map(self.find, langs)))
+
+    def probe_all(self, commands: Dict[str, List[str]]) -> Dict[str, Optional[str]]:
+        """并行执行多条版本查询命令"""
+        names = list(commands)
+        with ThreadPoolExecutor(max_workers=max(len(names), 1)) as executor:
+            return dict(zip(names, executor.map(self.probe, [commands[name] for name in names])))
+
+class BuildCache:
+    """按内容寻址的编译缓存，超出容量时按最近使用时间(LRU)淘汰"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """根据源码字节、编译器版本、编译参数等计算缓存键"""
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            digest.update(len(part).to_bytes(8, 'little'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """查找缓存条目，命中时刷新其使用时间"""
+        entry = self.cache_dir / key
+        if not entry.is_dir():
+            return None
+        try:
+            os.utime(entry, None)
+        except OSError:
+            pass
+        return entry
+
+    def restore(self, key: str, target_dir: Path) -> List[Path]:
+        """将缓存条目中的产物复制到目标目录，未命中时返回空列表"""
+        entry = self.lookup(key)
+        if entry is None:
+            return []
+        restored = []
+        for artifact in entry.iterdir():
+            target = target_dir / artifact.name
+            shutil.copy2(str(artifact), str(target))
+            restored.append(target)
+        return restored
+
+    def store(self, key: str, artifacts: List[Path]):
+        """保存编译产物；先写入临时目录再原子重命名，可供多进程同时使用"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self.cache_dir / key
+        if entry.is_dir():
+            return
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:16]}-", dir=str(self.cache_dir)))
+        try:
+            for artifact in artifacts:
+                shutil.copy2(str(artifact), str(staging / artifact.name))
+            os.replace(str(staging), str(entry))
+        except OSError:
+            shutil.rmtree(str(staging), ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """总大小超过上限时删除最久未使用的条目"""
+        entries = []
+        total = 0
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                continue
+            total += size
+        entries.sort(key=lambda item: item[0])
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(str(entry), ignore_errors=True)
+            total -= size
+
+class ResultCache:
+    """评测结果缓存（每个问题/语言一个 JSON 文件）
+
+    用例的缓存键由缓存格式版本、解决方案指纹（源码、编译器及参数）、输入和期望输出的哈希、时间和内存限制组成，
+    键未变化且上次通过的用例直接复用结果。同时记录上次失败的用例编号，供 --rerun-failed 使用。
+    """
+
+    # 缓存格式版本，耗时/内存的测量方式改变时递增，使之前缓存的结果失效
+    VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+            self.loaded = True
+        except (OSError, ValueError):
+            self.data = {}
+            self.loaded = False
+        self.data.setdefault('cases', {})
+        self.data.setdefault('files', {})
+        self.data.setdefault('failed', [])
+        self.touched = set()
+        self.passed_numbers = set()
+        self.failed_numbers = set()
+
+    @property
+    def failed(self) -> List[int]:
+        """上次运行后仍未通过的用例编号"""
+        return list(self.data['failed'])
+
+    def file_digest(self, path: Path) -> str:
+        """数据文件的哈希，按 (修改时间, 大小) 缓存，文件未变化时不再重新读取"""
+        stat = path.stat()
+        entry = self.data['files'].get(str(path))
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        self.data['files'][str(path)] = [stat.st_mtime_ns, stat.st_size, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def case_key(self, fingerprint: str, test_case: Dict, timeout: float, memory_limit: int,
+                 output_limit: int = 0) -> Optional[str]:
+        """计算用例的缓存键，数据文件无法读取时返回 None（该用例总是重新运行）"""
+        try:
+            if test_case.get("input_file"):
+                input_part = "file:" + self.file_digest(test_case["input_file"])
+            else:
+                input_part = test_case.get("input", "")
+            if test_case.get("output_file"):
+                output_part = "file:" + self.file_digest(test_case["output_file"])
+            else:
+                output_part = test_case.get("output", "")
+        except OSError:
+            return None
+        return BuildCache.make_key(str(self.VERSION), fingerprint, input_part, output_part, str(timeout),
+                                   str(memory_limit), str(output_limit))
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """查找缓存的通过结果"""
+        entry = self.data['cases'].get(key)
+        if entry is None:
+            return None
+        self.touched.add(key)
+        return {'verdict': Verdict.AC, 'time': entry['time'], 'cpu_time': entry.get('cpu_time'),
+                'memory': entry.get('memory'), 'output': '', 'error': '', 'mismatch': None, 'cached': True}
+
+    def store(self, key: str, result: Dict):
+        """保存通过的结果"""
+        self.touched.add(key)
+        self.data['cases'][key] = {'time': result['time'], 'cpu_time': result.get('cpu_time'),
+                                   'memory': result.get('memory')}
+
+    def record_outcome(self, number: int, passed: bool):
+        (self.passed_numbers if passed else self.failed_numbers).add(number)
+
+    def save(self, full_run: bool):
+        """写回缓存；完整运行时丢弃本次未用到的条目，并以本次失败的用例替换失败列表"""
+        if full_run:
+            self.data['cases'] = {key: value for key, value in self.data['cases'].items() if key in self.touched}
+            failed = self.failed_numbers
+        else:
+            failed = (set(self.data['failed']) - self.passed_numbers) | self.failed_numbers
+        self.data['failed'] = sorted(failed)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".results-", dir=str(self.path.parent))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(temp_path, str(self.path))
+
+class HistoryStore:
+    """评测历史记录（SQLite），每次运行为每个用例写入一行，用于查看耗时变化趋势"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT NOT NULL,
+            recorded_at REAL NOT NULL,
+            mode TEXT NOT NULL,
+            problem TEXT NOT NULL,
+            lang TEXT NOT NULL,
+            case_number INTEGER NOT NULL,
+            source_hash TEXT NOT NULL,
+            verdict TEXT NOT NULL,
+            wall_time REAL,
+            cpu_time REAL,
+            memory INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS runs_by_case ON runs (problem, lang, case_number, recorded_at);
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+
+    @contextlib.contextmanager
+    def connect(self):
+        """打开数据库（不存在时创建），多个评测进程可同时写入"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            connection.row_factory = sqlite3.Row
+            connection.executescript(self.SCHEMA)
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def record(self, problem: str, lang: str, source_hash: str, mode: str,
+               results: List[Tuple[int, Dict]]):
+        """写入一次运行的所有用例结果，results 为 [(用例编号, 评测结果字典)]"""
+        run_id = os.urandom(8).hex()
+        recorded_at = time.time()
+        rows = [(run_id, recorded_at, mode, problem, lang, number, source_hash, result['verdict'],
+                 result['time'], result.get('cpu_time'), result.get('memory'))
+                for number, result in results]
+        with self.connect() as connection:
+            connection.executemany(
+                "INSERT INTO runs (run_id, recorded_at, mode, problem, lang, case_number, source_hash, "
+                "verdict, wall_time, cpu_time, memory) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def case_trend(self, problem: str, lang: str, case_number: int, limit: int) -> List:
+        """某个用例最近 limit 次运行的记录（按时间先后排列）"""
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT recorded_at, mode, source_hash, verdict, wall_time, cpu_time, memory FROM runs "
+                "WHERE problem = ? AND lang = ? AND case_number = ? "
+                "ORDER BY recorded_at DESC, id DESC LIMIT ?", (problem, lang, case_number, limit)).fetchall()
+        return rows[::-1]
+
+    def run_trend(self, problem: str, lang: str, limit: int) -> List:
+        """某个问题最近 limit 次运行的汇总（用例数、通过数、总耗时、峰值内存）"""
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT MIN(recorded_at) AS recorded_at, mode, source_hash, COUNT(*) AS cases, "
+                "SUM(verdict = 'AC') AS passed, SUM(wall_time) AS wall_time, SUM(cpu_time) AS cpu_time, "
+                "MAX(memory) AS memory FROM runs WHERE problem = ? AND lang = ? "
+                "GROUP BY run_id ORDER BY recorded_at DESC LIMIT ?", (problem, lang, limit)).fetchall()
+        return rows[::-1]
+
+    def slowest(self, problem: Optional[str], langs: List[str], limit: int) -> List:
+        """按最近一次耗时从大到小列出用例，并附上该用例最早一次通过时的耗时"""
+        placeholders = ", ".join("?" for _ in langs)
+        with self.connect() as connection:
+            return connection.execute(
+                "SELECT r.problem, r.lang, r.case_number, r.verdict, r.wall_time, r.cpu_time, r.memory, "
+                "r.source_hash, r.recorded_at, "
+                "(SELECT f.wall_time FROM runs f WHERE f.problem = r.problem AND f.lang = r.lang "
+                " AND f.case_number = r.case_number AND f.verdict = 'AC' "
+                " ORDER BY f.recorded_at, f.id LIMIT 1) AS first_wall_time "
+                "FROM runs r WHERE r.id = ("
+                " SELECT l.id FROM runs l WHERE l.problem = r.problem AND l.lang = r.lang "
+                " AND l.case_number = r.case_number ORDER BY l.recorded_at DESC, l.id DESC LIMIT 1) "
+                f"AND r.lang IN ({placeholders}) AND (? IS NULL OR r.problem = ?) "
+                "ORDER BY r.wall_time DESC LIMIT ?", (*langs, problem, problem, limit)).fetchall()
+
+class TextTestSuite:
+    """tests.txt 的流式解析器
+
+    按行扫描文件并记录每个测试用例 INPUT/OUTPUT 内容的字节偏移作为索引，
+    用例内容只在访问时按偏移读取，内存占用与文件大小无关。
+    迭代时边扫描边产出用例，也可以通过下标直接定位到第 N 个用例。
+    用 "INPUT FILE: 路径" / "OUTPUT FILE: 路径" 可以引用外部数据文件（相对 tests.txt 所在目录）。
+    """
+
+    HEADER = b'=== TEST CASE'
+    INPUT_MARKS = ((b'INPUT:', 0), (b'INPUT FILE:', 1))
+    OUTPUT_MARKS = ((b'OUTPUT:', 0), (b'OUTPUT FILE:', 2))
+    ENTRY_SIZE = 5
+
+    def __init__(self, path: Path):
+        self.path = path
+        # 每个用例占 5 项：输入起点, 输入终点, 输出起点, 输出终点, 文件引用标志
+        # （紧凑存储，百万级用例也只占几十MB）
+        self.index = array.array('q')
+        self.complete = False
+        self.lock = threading.Lock()
+        self.scanner = None
+
+    @staticmethod
+    def match_mark(stripped: bytes, marks) -> Tuple[Optional[bytes], int]:
+        """判断行是否以给定标记之一开头"""
+        for mark, flag in marks:
+            if stripped.startswith(mark):
+                return mark, flag
+        return None, 0
+
+    def scan(self):
+        """逐行扫描文件，依次产出各测试用例的偏移"""
+        with open(self.path, 'rb') as f:
+            offset = 0
+            input_begin = input_end = output_begin = None
+            flags = 0
+            for line in f:
+                stripped = line.lstrip()
+                indent = len(line) - len(stripped)
+                if stripped.startswith(self.HEADER):
+                    # 新用例开始，结束上一个用例（标题行中的编号不影响解析）
+                    if output_begin is not None:
+                        yield (input_begin, input_end, output_begin, offset, flags)
+                    input_begin = input_end = output_begin = None
+                    flags = 0
+                elif input_begin is None:
+                    mark, flag = self.match_mark(stripped, self.INPUT_MARKS)
+                    if mark:
+                        input_begin = offset + indent + len(mark)
+                        flags |= flag
+                elif output_begin is None:
+                    mark, flag = self.match_mark(stripped, self.OUTPUT_MARKS)
+                    if mark:
+                        input_end = offset + indent
+                        output_begin = input_end + len(mark)
+                        flags |= flag
+                offset += len(line)
+            if output_begin is not None:
+                yield (input_begin, input_end, output_begin, offset, flags)
+
+    def ensure(self, count: int) -> bool:
+        """确保索引中至少有 count 个用例（只扫描必要的部分），返回是否存在这么多用例"""
+        with self.lock:
+            if self.scanner is None and not self.complete:
+                self.scanner = self.scan()
+            while len(self.index) < count * self.ENTRY_SIZE and not self.complete:
+                try:
+                    self.index.extend(next(self.scanner))
+                except StopIteration:
+                    self.complete = True
+                    self.scanner = None
+            return len(self.index) >= count * self.ENTRY_SIZE
+
+    def __len__(self) -> int:
+        self.ensure(sys.maxsize)
+        return len(self.index) // self.ENTRY_SIZE
+
+    def __getitem__(self, position: int) -> Dict:
+        if position < 0:
+            position += len(self)
+        if position < 0 or not self.ensure(position + 1):
+            raise IndexError(f"测试用例 {position + 1} 不存在")
+        return self.read_case(position)
+
+    def __iter__(self):
+        for position in itertools.count():
+            if not self.ensure(position + 1):
+                return
+            yield self.read_case(position)
+
+    def read_case(self, position: int) -> Dict:
+        """按索引偏移读取单个测试用例"""
+        begin = position * self.ENTRY_SIZE
+        input_begin, input_end, output_begin, output_end, flags = self.index[begin:begin + self.ENTRY_SIZE]
+        with open(self.path, 'rb') as f:
+            f.seek(input_begin)
+            input_text = f.read(input_end - input_begin).decode('utf-8', errors='replace').strip()
+            f.seek(output_begin)
+            output_text = f.read(output_end - output_begin).decode('utf-8', errors='replace').strip()
+
+        test_case = {}
+        if flags & 1:
+            test_case['input_file'] = self.path.parent / input_text
+        else:
+            test_case['input'] = input_text
+        if flags & 2:
+            test_case['output_file'] = self.path.parent / output_text
+        else:
+            test_case['output'] = output_text
+        return test_case
+
+class TestPack:
+    """测试用例的二进制索引包
+
+    由 tests.txt / tests.json 编译而来。文件头记录源文件的 (修改时间, 大小, SHA-256)、用例数
+    和索引位置，之后是数据区（每个用例的输入/输出内容，可选 zlib 压缩），末尾是索引
+    （每个用例输入/输出在数据区的偏移、长度和标志位）。加载时只映射文件(mmap)并校验文件头，
+    按下标直接切片取出用例，不做任何解析。外部数据文件(INPUT FILE/OUTPUT FILE)只保存相对于
+    测试文件所在目录的路径。
+    """
+
+    MAGIC = b'OJPACK\x00\x01'
+    # 魔数, 标志, 用例数, 索引偏移, 源文件修改时间(ns), 源文件大小, 源文件 SHA-256
+    HEADER = struct.Struct('<8sIIQqq32s')
+    # 输入偏移, 输入长度, 输出偏移, 输出长度, 标志位
+    ENTRY = struct.Struct('<QQQQI')
+    COMPRESSED = 1
+    INPUT_FILE, OUTPUT_FILE, INPUT_ZLIB, OUTPUT_ZLIB = 1, 2, 4, 8
+    # 小于该长度的内容不压缩
+    COMPRESS_MIN_SIZE = 1024
+
+    def __init__(self, path: Path, base_dir: Path):
+        self.base_dir = base_dir
+        with open(path, 'rb') as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.flags, self.count, self.index_offset, self.source_mtime, self.source_size, self.source_digest = \
+            self.HEADER.unpack_from(self.mapped, 0)
+        if magic != self.MAGIC or self.index_offset + self.count * self.ENTRY.size > len(self.mapped):
+            self.mapped.close()
+            raise ValueError(f"测试包格式错误: {path}")
+
+    @staticmethod
+    def file_digest(path: Path) -> bytes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.digest()
+
+    @classmethod
+    def open(cls, path: Path, source: Path, compress: bool) -> Optional['TestPack']:
+        """打开与源文件匹配的测试包；不存在、已过期或压缩设置不同时返回 None
+
+        源文件修改时间变化但内容哈希不变（如 git checkout、touch）时只更新文件头中的修改时间。
+        """
+        try:
+            pack = cls(path, source.parent)
+        except (OSError, ValueError, struct.error):
+            return None
+        stat = source.stat()
+        if bool(pack.flags & cls.COMPRESSED) != compress or pack.source_size != stat.st_size:
+            pack.close()
+            return None
+        if pack.source_mtime != stat.st_mtime_ns:
+            if cls.file_digest(source) != pack.source_digest:
+                pack.close()
+                return None
+            try:
+                with open(path, 'r+b') as f:
+                    f.seek(cls.HEADER.size - 8 - 8 - 32)
+                    f.write(struct.pack('<q', stat.st_mtime_ns))
+            except OSError:
+                pass
+        return pack
+
+    @classmethod
+    def build(cls, path: Path, source: Path, test_cases, compress: bool) -> 'TestPack':
+        """把用例写入新的测试包（先写临时文件再原子替换），返回打开的测试包"""
+        compress = compress and zlib is not None
+        stat = source.stat()
+        digest = cls.file_digest(source)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}-", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b'\0' * cls.HEADER.size)
+                offset = cls.HEADER.size
+                index = []
+
+                def put(value, file_flag: int, zlib_flag: int) -> Tuple[int, int, int]:
+                    nonlocal offset
+                    if isinstance(value, Path):
+                        data, flags = os.path.relpath(value, source.parent).encode('utf-8'), file_flag
+                    else:
+                        data, flags = str(value).encode('utf-8'), 0
+                        if compress and len(data) >= cls.COMPRESS_MIN_SIZE:
+                            packed = zlib.compress(data, 6)
+                            if len(packed) < len(data):
+                                data, flags = packed, zlib_flag
+                    f.write(data)
+                    offset += len(data)
+                    return offset - len(data), len(data), flags
+
+                for test_case in test_cases:
+                    if "input_file" in test_case:
+                        value = Path(test_case["input_file"])
+                    else:
+                        value = test_case.get("input", "")
+                    input_offset, input_length, input_flags = put(value, cls.INPUT_FILE, cls.INPUT_ZLIB)
+                    if "output_file" in test_case:
+                        value = Path(test_case["output_file"])
+                    else:
+                        value = test_case.get("output", "")
+                    output_offset, output_length, output_flags = put(value, cls.OUTPUT_FILE, cls.OUTPUT_ZLIB)
+                    index.append(cls.ENTRY.pack(input_offset, input_length, output_offset, output_length,
+                                                input_flags | output_flags))
+                f.write(b''.join(index))
+                f.seek(0)
+                f.write(cls.HEADER.pack(cls.MAGIC, cls.COMPRESSED if compress else 0, len(index), offset,
+                                        stat.st_mtime_ns, stat.st_size, digest))
+            os.replace(temp_name, str(path))
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except OSError:
+                pass
+            raise
+        return cls(path, source.parent)
+
+    def close(self):
+        self.mapped.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, position: int) -> Dict:
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError(f"测试用例 {position + 1} 不存在")
+        input_offset, input_length, output_offset, output_length, flags = \
+            self.ENTRY.unpack_from(self.mapped, self.index_offset + position * self.ENTRY.size)
+        input_data = self.mapped[input_offset:input_offset + input_length]
+        output_data = self.mapped[output_offset:output_offset + output_length]
+        test_case = {}
+        if flags & self.INPUT_FILE:
+            test_case['input_file'] = self.base_dir / input_data.decode('utf-8')
+        else:
+            if flags & self.INPUT_ZLIB:
+                input_data = zlib.decompress(input_data)
+            test_case['input'] = input_data.decode('utf-8')
+        if flags & self.OUTPUT_FILE:
+            test_case['output_file'] = self.base_dir / output_data.decode('utf-8')
+        else:
+            if flags & self.OUTPUT_ZLIB:
+                output_data = zlib.decompress(output_data)
+            test_case['output'] = output_data.decode('utf-8')
+        return test_case
+
+    def __iter__(self):
+        for position in range(self.count):
+            yield self[position]
+
+def iter_line_blocks(read_chunk):
+    """将按块读取的字节流增量解码并切分为行，每次产出一批行
+
+    read_chunk() 每次返回一块字节，返回空字节表示结束。
+    结果与 text.split('\\n') 一致（最后一行不以换行结尾时同样产出）。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    partial = []
+    while True:
+        chunk = read_chunk()
+        text = decoder.decode(chunk, final=not chunk)
+        if '\n' in text:
+            lines = text.split('\n')
+            if partial:
+                lines[0] = ''.join(partial) + lines[0]
+            partial = [lines.pop()]
+            yield lines
+        elif text:
+            # 超长行分多块到达时先暂存，避免重复拼接
+            partial.append(text)
+        if not chunk:
+            yield [''.join(partial)]
+            return
+
+def iter_file_line_blocks(path: Path, chunk_size: int = 1024 * 1024):
+    """通过 mmap 分块读取文件并按行产出，内存占用与文件大小无关"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield ['']
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = [0]
+
+            def read_chunk():
+                chunk = mapped[position[0]:position[0] + chunk_size]
+                position[0] += len(chunk)
+                return chunk
+
+            yield from iter_line_blocks(read_chunk)
+
+def normalized_blocks(blocks):
+    """按比较规则规范化输出行：去除整体首尾空白和每行行尾空白
+
+    与 [line.rstrip() for line in text.strip().split('\\n')] 等价，但按批处理，
+    可用于文件或管道数据而无需整体读入内存。
+    """
+    started = False
+    blank_lines = 0
+    for block in blocks:
+        if not any(block):
+            # 整批都是空行（如不断输出换行）时不必逐行处理
+            if started:
+                blank_lines += len(block)
+            continue
+        lines = [line.rstrip() for line in block]
+        if not started:
+            first = next((i for i, line in enumerate(lines) if line.strip()), None)
+            if first is None:
+                continue
+            started = True
+            lines = lines[first:]
+            lines[0] = lines[0].lstrip()
+        # 末尾的空行是否保留要看后面是否还有内容
+        end = len(lines)
+        while end and not lines[end - 1]:
+            end -= 1
+        if end == 0:
+            blank_lines += len(lines)
+            continue
+        if blank_lines:
+            lines[:0] = [''] * blank_lines
+            end += blank_lines
+        blank_lines = len(lines) - end
+        del lines[end:]
+        yield lines
+    if not started:
+        yield ['']
+
+def find_mismatch(expected_blocks, actual_blocks) -> Optional[Tuple[int, int, Optional[str], Optional[str]]]:
+    """逐批比较两组输出（按 normalized_blocks 规则），返回第一处不同 (行号, 列号, 期望行, 实际行)
+
+    两边都是惰性读取的，找到第一处不同后立即返回，不再读取剩余内容；完全一致时返回 None。
+    """
+    expected_iter = normalized_blocks(expected_blocks)
+    actual_iter = normalized_blocks(actual_blocks)
+    expected, actual = [], []
+    expected_pos = actual_pos = 0
+    line_number = 0
+    while True:
+        if expected_pos == len(expected):
+            expected, expected_pos = next(expected_iter, None), 0
+        if actual_pos == len(actual):
+            actual, actual_pos = next(actual_iter, None), 0
+        if expected is None or actual is None:
+            if expected is None and actual is None:
+                return None
+            # 一方已经结束，另一方还有内容
+            extra_expected = expected[expected_pos] if expected is not None else None
+            extra_actual = actual[actual_pos] if actual is not None else None
+            return line_number + 1, 1, extra_expected, extra_actual
+        count = min(len(expected) - expected_pos, len(actual) - actual_pos)
+        expected_part = expected[expected_pos:expected_pos + count]
+        actual_part = actual[actual_pos:actual_pos + count]
+        if expected_part != actual_part:
+            offset = next(i for i, (e, a) in enumerate(zip(expected_part, actual_part)) if e != a)
+            expected_line, actual_line = expected_part[offset], actual_part[offset]
+            column = next((i for i, (e, a) in enumerate(zip(expected_line, actual_line), 1) if e != a),
+                          min(len(expected_line), len(actual_line)) + 1)
+            return line_number + offset + 1, column, expected_line, actual_line
+        expected_pos += count
+        actual_pos += count
+        line_number += count
+
+def timing_stats(samples: List[float]) -> Dict[str, float]:
+    """计算一组耗时的最小值、中位数、P95（最近秩）和标准差"""
+    ordered = sorted(samples)
+    return {
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p95': ordered[max(math.ceil(0.95 * len(ordered)) - 1, 0)],
+        'stddev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+# 复杂度模型: (名称, 规模函数)
+COMPLEXITY_MODELS = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(√n)", lambda n: math.sqrt(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n²)", lambda n: float(n) ** 2),
+    ("O(n² log n)", lambda n: float(n) ** 2 * math.log2(n)),
+    ("O(n³)", lambda n: float(n) ** 3),
+]
+
+def fit_complexity(sizes: List[int], times: List[float]) -> List[Tuple[str, float, float, float]]:
+    """用 t = a + b·f(n)（a, b ≥ 0）拟合各复杂度模型，按相对误差从小到大返回 [(模型, 相对误差, a, b)]
+
+    以 1/t² 加权做最小二乘，使各个规模的相对误差同等重要；a 吸收进程启动等固定开销。
+    """
+    weights = [1 / max(t, 1e-6) ** 2 for t in times]
+    total_weight = sum(weights)
+    fits = []
+    for name, model in COMPLEXITY_MODELS:
+        xs = [model(n) for n in sizes]
+        sum_x = sum(w * x for w, x in zip(weights, xs))
+        sum_y = sum(w * y for w, y in zip(weights, times))
+        sum_xx = sum(w * x * x for w, x in zip(weights, xs))
+        sum_xy = sum(w * x * y for w, x, y in zip(weights, xs, times))
+        denominator = total_weight * sum_xx - sum_x * sum_x
+        a, b = sum_y / total_weight, 0.0
+        if name != "O(1)" and denominator > 0:
+            slope = (total_weight * sum_xy - sum_x * sum_y) / denominator
+            if slope > 0:
+                a, b = (sum_y - slope * sum_x) / total_weight, slope
+                if a < 0:
+                    a, b = 0.0, sum_xy / sum_xx
+        error = math.sqrt(sum(w * (y - a - b * x) ** 2 for w, x, y in zip(weights, xs, times)) / len(times))
+        fits.append((name, error, a, b))
+    return sorted(fits, key=lambda fit: fit[1])
+
+def predict_max_size(name: str, a: float, b: float, limit: float) -> Optional[int]:
+    """按拟合结果估计运行时间不超过 limit 的最大规模；时间不随规模增长时返回 None"""
+    model = dict(COMPLEXITY_MODELS)[name]
+    if b <= 0:
+        return None
+    if a + b * model(2) > limit:
+        return 1
+    low, high = 2, 4
+    while a + b * model(high) <= limit:
+        low, high = high, high * 2
+        if high > 10 ** 18:
+            return None
+    while high - low > 1:
+        middle = (low + high) // 2
+        if a + b * model(middle) <= limit:
+            low = middle
+        else:
+            high = middle
+    return low
+
 class OJTester:
-    def __init__(self, use_wsl: bool = False, timeout: int = 5):
+    # 实际输出中保留用于显示的最大字符数
+    DISPLAY_LIMIT = 64 * 1024
+    # 读取子进程输出的块大小
+    CHUNK_SIZE = 1024 * 1024
+    # 超过该大小的 tests.txt 不预先统计用例数，边读取边运行
+    STREAM_THRESHOLD = 16 * 1024 * 1024
+    # 内存分配失败时常见的错误信息，用于识别内存超限
+    OUT_OF_MEMORY_MARKERS = ("std::bad_alloc", "MemoryError", "OutOfMemoryError", "Cannot allocate memory")
+    # 各语言源文件的匹配模式
+    SOURCE_PATTERNS = {"cpp": "*.cpp", "c": "*.c", "java": "*.java", "python": "*.py"}
+    # 与基线比较时，中位耗时的增加量低于该值(秒)不视为退化
+    BASELINE_NOISE_FLOOR = 0.002
+    # 串行/并发对比时允许的中位耗时相对差异（另外允许串行标准差的 2 倍）
+    PARALLEL_TOLERANCE = 0.05
+    # C/C++ 编译配置对应的编译参数；pgo 以 O2 为基础，先用测试用例训练插桩版本再按 profile 重新编译
+    BUILD_PROFILES = {
+        "debug": ["-O0", "-g", "-fno-omit-frame-pointer", "-fsanitize=address,undefined",
+                  "-fno-sanitize-recover=all"],
+        "O2": ["-O2"],
+        "O3": ["-O3", "-march=native"],
+        "lto": ["-O2", "-flto"],
+        "pgo": ["-O2"],
+    }
+    DEFAULT_BUILD_PROFILE = "O2"
+    # clang 的 PGO 训练数据经 llvm-profdata 合并后的文件名（位于 profile 数据目录中）
+    CLANG_PROFDATA = "default.profdata"
+    # 预编译头文件名（同目录下的 .gch 为预编译结果）
+    PCH_HEADER = "oj_pch.h"
+
+    def __init__(self, use_wsl: bool = False, timeout: int = 5, jobs: int = 1, problem_jobs: int = 1,
+                 cache_size_mb: int = 512, memory_limit: int = 0, fork_server: bool = True,
+                 history: bool = True,
+                 result_cache: bool = True, rerun_failed: bool = False, build_profile: str = "O2",
+                 pch: bool = True, test_pack: bool = True, pack_compress: bool = False, cgroup: bool = True,
+                 pin_cpus: bool = False, reserve_core: bool = False, output_limit: int = 64):
         self.use_wsl = use_wsl
         self.timeout = timeout
+        # 并发执行测试用例的线程数，0 表示使用全部CPU核心
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        # --all 时同时评测的问题数（进程数），0 表示使用全部CPU核心
+        self.problem_jobs = problem_jobs if problem_jobs > 0 else (os.cpu_count() or 1)
+        # 默认内存限制(MB)，0 表示不限制；可在问题目录的 problem.json 中单独设置
+        self.memory_limit = memory_limit
+        # 默认输出限制(MB)，0 表示不限制；可在 problem.json 中单独设置，超过时立即结束程序（OLE）
+        self.output_limit = output_limit
+        # Python 用例通过预热执行器运行（仅 POSIX），首次需要时启动
+        self.use_fork_server = fork_server and os.name == 'posix' and hasattr(socket, 'AF_UNIX') \
+            and hasattr(os, 'fork') and not use_wsl
+        self.fork_server = None
+        # 启动预热执行器时的环境变量，变化后重新启动（见 get_fork_server）
+        self.fork_server_env = None
+        self.fork_server_lock = threading.Lock()
+        # 每次运行放在单独的 cgroup v2 中限制 CPU、内存和进程数（仅 Linux，首次需要时创建），
+        # 不可用时退回 rlimit 限制；cgroup_status 说明实际使用的方式
+        self.use_cgroup = cgroup and sys.platform.startswith('linux') and not use_wsl
+        self.cgroup_sandbox = None
+        self.cgroup_lock = threading.Lock()
+        self.cgroup_status = None if self.use_cgroup else "rlimit"
+        # 不在 cgroup 中运行时，Linux 上通过启动器测量被评测程序自身的峰值内存（首次需要时编译，
+        # 为 None 表示尚未准备，False 表示不可用）
+        self.memory_launcher = None if sys.platform.startswith('linux') and not use_wsl else False
+        self.memory_launcher_lock = threading.Lock()
+        # 绑定 CPU 时每个并发任务独占一个物理核心，并发数不超过可用核心数；
+        # 各评测进程无法共享核心分配，问题改为逐个评测
+        self.cpu_scheduler = None
+        if (pin_cpus or reserve_core) and not use_wsl:
+            if hasattr(os, 'sched_setaffinity'):
+                self.cpu_scheduler = CpuScheduler(reserve_core)
+                if reserve_core and self.cpu_scheduler.judge_cpu is None:
+                    self.print_warning("只有 1 个可用核心，无法为评测器保留核心")
+                if self.jobs > len(self.cpu_scheduler.cpus):
+                    self.print_warning(f"绑定 CPU 时并发数不超过可用物理核心数，--jobs 改为 {len(self.cpu_scheduler.cpus)}")
+                    self.jobs = len(self.cpu_scheduler.cpus)
+                if self.problem_jobs > 1:
+                    self.print_warning("绑定 CPU 时问题改为逐个评测，--problem-jobs 改为 1")
+                    self.problem_jobs = 1
+            else:
+                self.print_warning("当前平台不支持设置 CPU 亲和性，忽略 CPU 绑定")
+        self.python_command = None
+        # 复用未变化用例的通过结果；rerun_failed 时只运行上次失败的用例
+        self.use_result_cache = result_cache
+        self.rerun_failed = rerun_failed
+        # C/C++ 编译配置（见 BUILD_PROFILES），非默认配置的产物单独存放
+        self.build_profile = build_profile
+        # 已解析的测试用例: 测试文件路径 → ((修改时间, 大小), 用例)
+        self.test_case_cache = {}
+        # 测试用例编译为二进制测试包(build/<问题>/)，源文件变化时自动重建；pack_compress 时压缩用例内容
+        self.use_test_pack = test_pack
+        self.pack_compress = pack_compress and zlib is not None
         self.problems_dir = Path("problems")
         self.build_dir = Path("build")
-        self.results = []
+        # 每次运行的用例耗时记录在 SQLite 历史中（不放在构建目录，清理构建产物时保留）
+        self.history = HistoryStore(Path(".oj") / "history.sqlite3") if history and sqlite3 is not None else None
+        # 编译缓存，cache_size_mb 为 0 时禁用
+        self.build_cache = BuildCache(self.build_dir / ".cache", cache_size_mb * 1024 * 1024) if cache_size_mb > 0 else None
+        # C++ 预编译头按编译器、编译参数和头文件列表存放在 build/pch/，与编译缓存共用容量上限
+        self.pch_cache = BuildCache(self.build_dir / "pch", cache_size_mb * 1024 * 1024) \
+            if pch and cache_size_mb > 0 and not use_wsl else None
+        self.pch_failures = set()
+        self.compiler_versions = {}
+        # 编译器按需探测，结果缓存在 self.compilers 和磁盘上
+        self.compiler_detector = CompilerDetector(self.build_dir / ".compilers.json")
+        self.compilers = {'python': True}  # Python始终可用
 
         # 在Windows下检测颜色支持
         if platform.system() == "Windows" and os.environ.get('TERM') != 'xterm':
@@ -56,6 +2080,22 @@ class OJTester:
         # 检测和设置环境
         self.setup_environment()
 
+    def __getstate__(self):
+        # 传给评测子进程时不携带预热执行器，子进程按需自行启动
+        state = self.__dict__.copy()
+        state['fork_server'] = None
+        state['test_case_cache'] = {}
+        del state['fork_server_lock']
+        del state['memory_launcher_lock']
+        del state['cgroup_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.fork_server_lock = threading.Lock()
+        self.memory_launcher_lock = threading.Lock()
+        self.cgroup_lock = threading.Lock()
+
     def setup_environment(self):
         """设置和检测运行环境"""
         # 检查Python版本
@@ -63,77 +2103,38 @@ class OJTester:
         if python_version < (3, 6):
             self.print_warning(f"Python版本 {python_version.major}.{python_version.minor} 可能不支持所有功能，建议升级到3.6+")
 
-        # 检查编译器
-        self.check_compilers()
+        if self.build_profile == "debug":
+            # 算法题的解法通常不释放内存，关闭 LeakSanitizer 以免把内存泄漏判为运行时错误
+            os.environ.setdefault("ASAN_OPTIONS", "detect_leaks=0")
+
+        # 编译器不在启动时探测，而是在首次需要某种语言时按需探测（见 get_compiler）
 
     def check_compilers(self):
-        """检查可用编译器"""
-        self.compilers = {
-            'cpp': self.find_cpp_compiler(),
-            'c': self.find_c_compiler(),
-            'java': self.find_java_compiler(),
-            'python': True  # Python始终可用
-        }
+        """并行检查所有可用编译器"""
+        langs = [lang for lang in ('cpp', 'c', 'java') if lang not in self.compilers]
+        self.compilers.update(self.compiler_detector.find_all(langs))
+
+    def get_compiler(self, lang: str) -> Optional[str]:
+        """获取指定语言的编译器，只探测所请求的语言"""
+        if lang not in self.compilers:
+            self.compilers[lang] = self.compiler_detector.find(lang)
+        return self.compilers[lang]
 
     def find_cpp_compiler(self) -> Optional[str]:
         """查找C++编译器"""
-        compilers = ['g++', 'clang++']
-
-        # 检查PATH中的编译器
-        for compiler in compilers:
-            if self.is_command_available(compiler):
-                return compiler
-
-        # Windows: 检查常用安装路径
-        if platform.system() == "Windows":
-            common_paths = [
-                r"C:\mingw64\bin\g++.exe",
-                r"C:\Program Files\mingw-w64\x86_64-8.1.0-win32-seh-rt_v6-rev0\mingw64\bin\g++.exe",
-                r"C:\MinGW\bin\g++.exe"
-            ]
-            for path in common_paths:
-                if os.path.exists(path):
-                    return path
-
-        return None
+        return self.compiler_detector.find('cpp')
 
     def find_c_compiler(self) -> Optional[str]:
-        """查找C编译器"""
-        compilers = ['gcc', 'clang']
-
-        for compiler in compilers:
-            if self.is_command_available(compiler):
-                return compiler
-
-        # Windows: 检查常用安装路径
-        if platform.system() == "Windows":
-            common_paths = [
-                r"C:\mingw64\bin\gcc.exe",
-                r"C:\Program Files\mingw-w64\x86_64-8.1.0-win32-seh-rt_v6-rev0\mingw64\bin\gcc.exe",
-                r"C:\MinGW\bin\gcc.exe"
-            ]
-            for path in common_paths:
-                if os.path.exists(path):
-                    return path
-
-        return None
+        """查找C编译器"""
+        return self.compiler_detector.find('c')
 
     def find_java_compiler(self) -> Optional[str]:
         """查找Java编译器"""
-        if self.is_command_available('javac'):
-            return 'javac'
-        return None
+        return self.compiler_detector.find('java')
 
     def is_command_available(self, command: str) -> bool:
         """检查命令是否可用"""
-        try:
-            subprocess.run([command, '--version'],
-                         capture_output=True,
-                         check=True,
-                         timeout=5)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        return self.compiler_detector.probe([command, '--version']) is not None
 
     def print_environment_info(self):
         """打印环境信息"""
@@ -143,7 +2144,9 @@ class OJTester:
         print(f"操作系统: {platform.system()} {platform.release()}")
 
         print(f"\n编译器状态:")
-        for lang, compiler in self.compilers.items():
+        self.check_compilers()
+        for lang in ('cpp', 'c', 'java', 'python'):
+            compiler = self.compilers[lang]
             if lang == 'python':
                 status = f"{Colors.GREEN}✓ 可用{Colors.END}"
             elif compiler:
@@ -152,6 +2155,16 @@ class OJTester:
                 status = f"{Colors.RED}✗ 未找到{Colors.END}"
             print(f"  {lang.upper():4}: {status}")
 
+        self.get_cgroup_sandbox()
+        print(f"\n资源隔离: {self.cgroup_status}")
+        if self.cgroup_sandbox is None and sys.platform.startswith('linux'):
+            launcher = self.get_memory_launcher()
+            print(f"峰值内存: {f'启动器 ({launcher})' if launcher else '不可用 (需要 C 编译器)'}")
+        if self.cpu_scheduler is not None:
+            judge_cpu = self.cpu_scheduler.judge_cpu
+            print(f"CPU 绑定: 评测用 CPU {self.cpu_scheduler.cpus}"
+                  + (f", 评测器使用 CPU {judge_cpu}" if judge_cpu is not None else ""))
+
     def print_header(self, text: str):
         """打印标题"""
         print(f"\n{Colors.CYAN}{Colors.BOLD}{'='*60}{Colors.END}")
@@ -174,6 +2187,19 @@ class OJTester:
         """打印信息"""
         print(f"{Colors.BLUE}ℹ {text}{Colors.END}")
 
+    def load_problem_config(self, problem_dir: Path) -> Dict:
+        """加载问题配置 problem.json（可选），如 {"memory_limit": 256, "output_limit": 64}"""
+        config_file = problem_dir / "problem.json"
+        if not config_file.exists():
+            return {}
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            return config if isinstance(config, dict) else {}
+        except (OSError, ValueError) as e:
+            self.print_warning(f"无法读取问题配置 {config_file}: {e}")
+            return {}
+
     def load_test_cases(self, problem_dir: Path) -> List[Dict]:
         """加载测试用例"""
         # 优先尝试新的文本格式
@@ -181,60 +2207,79 @@ class OJTester:
         tests_json_file = problem_dir / "tests.json"
         
         if tests_txt_file.exists():
-            return self.load_test_cases_from_txt(tests_txt_file)
+            tests_file, loader = tests_txt_file, self.load_test_cases_from_txt
         elif tests_json_file.exists():
-            return self.load_test_cases_from_json(tests_json_file)
+            tests_file, loader = tests_json_file, self.load_test_cases_from_json
         else:
             raise FileNotFoundError(f"测试文件不存在: {tests_txt_file} 或 {tests_json_file}")
-    
-    def load_test_cases_from_txt(self, tests_file: Path) -> List[Dict]:
-        """从文本格式加载测试用例"""
+
+        # 同一进程中（如监视模式）测试文件未修改时复用已解析的用例
+        stat = tests_file.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self.test_case_cache.get(tests_file)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        test_cases = self.load_test_pack(problem_dir, tests_file, loader) if self.use_test_pack \
+            else loader(tests_file)
+        self.test_case_cache[tests_file] = (signature, test_cases)
+        return test_cases
+
+    def load_test_pack(self, problem_dir: Path, tests_file: Path, loader):
+        """从测试包加载用例；测试包不存在或已过期时先解析测试文件并重建
+
+        超过 STREAM_THRESHOLD 的 tests.txt 不在运行前重建（否则要先扫描整个文件），
+        而是直接返回流式解析器，运行结束后再由 save_pending_test_pack 生成测试包。
+        """
+        pack_file = self.build_dir / problem_dir.name / f"{tests_file.name}.pack"
+        pack = TestPack.open(pack_file, tests_file, self.pack_compress)
+        if pack is not None:
+            return pack
+        test_cases = loader(tests_file)
+        if isinstance(test_cases, TextTestSuite) and tests_file.stat().st_size > self.STREAM_THRESHOLD:
+            return test_cases
+        return self.save_test_pack(pack_file, tests_file, test_cases)
+
+    def save_test_pack(self, pack_file: Path, tests_file: Path, test_cases):
+        """把用例写入测试包并返回打开的测试包，失败时给出警告并返回原来的用例"""
+        start_time = time.perf_counter()
         try:
-            with open(tests_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            test_cases = []
-            # 按测试用例分割
-            case_sections = content.split('=== TEST CASE')
-            
-            for i, section in enumerate(case_sections):
-                if i == 0 and not section.strip():
-                    continue  # 跳过第一个空段
-                
-                section = section.strip()
-                if not section:
-                    continue
-                
-                # 移除开头的数字和 ===
-                if section.startswith(str(i)) or any(section.startswith(str(j)) for j in range(1, 100)):
-                    lines = section.split('\n')
-                    section = '\n'.join(lines[1:])  # 移除第一行的 "1 ==="
-                
-                # 查找 INPUT: 和 OUTPUT: 标记
-                if 'INPUT:' not in section or 'OUTPUT:' not in section:
-                    continue
-                
-                input_start = section.find('INPUT:') + len('INPUT:')
-                output_start = section.find('OUTPUT:')
-                
-                if output_start == -1:
-                    continue
-                
-                input_text = section[input_start:output_start].strip()
-                output_text = section[output_start + len('OUTPUT:'):].strip()
-                
-                test_cases.append({
-                    'input': input_text,
-                    'output': output_text
-                })
-            
-            if not test_cases:
+            pack = TestPack.build(pack_file, tests_file, test_cases, self.pack_compress)
+        except (OSError, ValueError, struct.error) as e:
+            self.print_warning(f"生成测试包失败，直接使用测试文件: {e}")
+            return test_cases
+        elapsed = time.perf_counter() - start_time
+        if elapsed >= 0.5:
+            self.print_info(f"已生成测试包 {pack_file} ({len(pack)} 个用例, {elapsed:.2f}s)")
+        return pack
+
+    def save_pending_test_pack(self, problem_dir: Path, test_cases):
+        """为边读取边运行的大测试文件补建测试包（用例已全部扫描过时），下次运行直接使用"""
+        if not (self.use_test_pack and isinstance(test_cases, TextTestSuite) and test_cases.complete):
+            return
+        tests_file = test_cases.path
+        pack_file = self.build_dir / problem_dir.name / f"{tests_file.name}.pack"
+        pack = self.save_test_pack(pack_file, tests_file, test_cases)
+        if pack is not test_cases:
+            cached = self.test_case_cache.get(tests_file)
+            if cached is not None and cached[1] is test_cases:
+                self.test_case_cache[tests_file] = (cached[0], pack)
+
+    def load_test_cases_from_txt(self, tests_file: Path) -> TextTestSuite:
+        """从文本格式加载测试用例（流式解析，用例在访问时才读取）"""
+        try:
+            test_cases = TextTestSuite(tests_file)
+            if not test_cases.ensure(1):
                 raise ValueError("没有找到有效的测试用例")
-            
             return test_cases
-            
         except Exception as e:
             raise ValueError(f"解析文本格式测试用例失败: {e}")
+
+    def count_test_cases(self, test_cases) -> Optional[int]:
+        """统计用例数；大文件不预先扫描，返回 None 以便立即开始运行"""
+        if isinstance(test_cases, TextTestSuite) and not test_cases.complete:
+            if test_cases.path.stat().st_size > self.STREAM_THRESHOLD:
+                return None
+        return len(test_cases)
     
     def load_test_cases_from_json(self, tests_file: Path) -> List[Dict]:
         """从JSON格式加载测试用例（保持向后兼容）"""
@@ -250,35 +2295,59 @@ class OJTester:
                 tests = json.loads(content)
                 if isinstance(tests, dict):
                     tests = [tests]  # 单个测试用例转换为列表
+                # 外部数据文件路径相对于 tests.json 所在目录
+                for test in tests:
+                    for key in ("input_file", "output_file"):
+                        if key in test:
+                            test[key] = tests_file.parent / test[key]
                 return tests
         except json.JSONDecodeError as e:
             raise ValueError(f"JSON格式错误: {e}")
 
-    def get_compiler_command(self, lang: str, source_file: Path, output_file: Path) -> List[str]:
-        """获取编译命令"""
-        if lang == "cpp":
-            if self.use_wsl:
-                # 将Windows路径转换为WSL路径格式
-                wsl_source = str(source_file).replace('\\', '/').replace('E:', '/mnt/e')
-                wsl_output = str(output_file).replace('\\', '/').replace('E:', '/mnt/e')
-                base_cmd = ["g++", "-std=c++17", "-O2", "-o", wsl_output, wsl_source]
-                return ["wsl"] + base_cmd
-            else:
-                base_cmd = ["g++", "-std=c++17", "-O2", "-o", str(output_file), str(source_file)]
-                return base_cmd
-        elif lang == "c":
+    def get_compiler_command(self, lang: str, source_file: Path, output_file: Path,
+                             profile: Optional[str] = None, training: bool = False) -> List[str]:
+        """获取编译命令
+
+        profile 为 C/C++ 的编译配置（默认使用 self.build_profile）；
+        pgo 配置下 training 为 True 时生成插桩版本，否则使用训练得到的 profile 数据
+        （gcc 直接读取 .gcda；clang 读取 llvm-profdata 合并后的 .profdata，找不到 llvm-profdata 时不使用 PGO）。
+        """
+        profile = profile or self.build_profile
+        if lang in ["cpp", "c"]:
+            flags = list(self.BUILD_PROFILES[profile])
+            if profile == "pgo":
+                profile_dir = str(self.profile_data_dir(output_file).resolve())
+                if self.use_wsl:
+                    profile_dir = profile_dir.replace('\\', '/').replace('E:', '/mnt/e')
+                compiler = None if self.use_wsl else self.get_compiler(lang)
+                if compiler and self.is_clang(compiler):
+                    # clang 生成 .profraw，需要先用 llvm-profdata 合并；找不到 llvm-profdata 时不加 PGO 参数，
+                    # 由 compile_solution 给出警告并按普通 O2 编译
+                    if self.find_llvm_profdata(compiler) is not None:
+                        if training:
+                            flags.append(f"-fprofile-generate={profile_dir}")
+                        else:
+                            flags += [f"-fprofile-use={profile_dir}/{self.CLANG_PROFDATA}",
+                                      "-Wno-profile-instr-unprofiled", "-Wno-profile-instr-out-of-date"]
+                elif training:
+                    flags.append(f"-fprofile-generate={profile_dir}")
+                else:
+                    # 保留 gcc 的 -Wmissing-profile：.gcda 的文件名取决于输出路径，找不到时应当提示
+                    flags += [f"-fprofile-use={profile_dir}", "-fprofile-correction"]
+            std = "-std=c++17" if lang == "cpp" else "-std=c99"
             if self.use_wsl:
                 # 将Windows路径转换为WSL路径格式
                 wsl_source = str(source_file).replace('\\', '/').replace('E:', '/mnt/e')
                 wsl_output = str(output_file).replace('\\', '/').replace('E:', '/mnt/e')
-                base_cmd = ["gcc", "-std=c99", "-O2", "-o", wsl_output, wsl_source]
+                base_cmd = ["g++" if lang == "cpp" else "gcc", std] + flags + ["-o", wsl_output, wsl_source]
                 return ["wsl"] + base_cmd
             else:
-                base_cmd = ["gcc", "-std=c99", "-O2", "-o", str(output_file), str(source_file)]
+                compiler = self.get_compiler(lang) or ("g++" if lang == "cpp" else "gcc")
+                base_cmd = [compiler, std] + flags + ["-o", str(output_file), str(source_file)]
                 return base_cmd
         elif lang == "java":
-            # Java需要特殊处理
-            return ["javac", str(source_file)]
+            # 类文件输出到构建目录（编译时工作目录为构建目录，需使用绝对路径）
+            return ["javac", "-encoding", "UTF-8", "-d", str(output_file.parent.resolve()), str(source_file.resolve())]
         elif lang == "python":
             # Python不需要编译，直接返回空命令
             return []
@@ -297,143 +2366,1088 @@ class OJTester:
             class_name = executable.stem
             return ["java", "-cp", str(executable.parent), class_name]
         elif lang == "python":
+            return [self.get_python_command(), str(executable)]
+        else:
+            raise ValueError(f"不支持的语言: {lang}")
+
+    def get_python_command(self) -> str:
+        """获取运行Python解决方案的解释器（只在第一次选择时提示）"""
+        if self.python_command is None:
             # 优先使用便携Python（环境变量控制）
             portable_python = os.environ.get('PORTABLE_PYTHON')
             if portable_python and os.path.exists(portable_python):
                 self.print_info(f"使用便携Python: {portable_python}")
-                return [portable_python, str(executable)]
+                self.python_command = portable_python
             else:
                 self.print_info("使用系统Python")
-                return ["python", str(executable)]
+                self.python_command = "python"
+        return self.python_command
+
+    def get_fork_server(self) -> Optional[PythonForkServer]:
+        """获取（必要时启动）Python 预热执行器，不可用时返回 None"""
+        # 评测器可能需要先移入叶子 cgroup，应在启动服务进程之前完成
+        self.get_cgroup_sandbox()
+        with self.fork_server_lock:
+            if not self.use_fork_server:
+                return None
+            if self.fork_server is not None and self.fork_server.alive():
+                if self.fork_server_env == os.environ:
+                    return self.fork_server
+                # 评测服务中环境变量随请求变化，子进程从执行器继承环境，需要重新启动
+                self.fork_server.close()
+            python = shutil.which(self.get_python_command()) or self.get_python_command()
+            try:
+                self.fork_server_env = dict(os.environ)
+                self.fork_server = PythonForkServer(python)
+                self.print_info("已启动 Python 预热执行器")
+            except OSError as e:
+                self.print_warning(f"无法启动 Python 预热执行器，改为逐个启动解释器: {e}")
+                self.use_fork_server = False
+                self.fork_server = None
+            return self.fork_server
+
+    def find_source_file(self, problem: str, lang: str, role: Optional[str] = None) -> Optional[Path]:
+        """查找问题目录下指定语言的源文件（使用第一个找到的源文件）
+
+        role 为 gen/brute 等辅助程序时在同名子目录中查找，否则在语言目录中查找。
+        """
+        pattern = self.SOURCE_PATTERNS.get(lang)
+        source_dir = self.problems_dir / problem / (role or lang)
+        if pattern is None or not source_dir.is_dir():
+            return None
+        return next(iter(source_dir.glob(pattern)), None)
+
+    def detect_language(self, problem: str, role: str) -> Optional[str]:
+        """根据源文件扩展名判断辅助程序（gen/brute）使用的语言"""
+        for lang in self.SOURCE_PATTERNS:
+            if self.find_source_file(problem, lang, role) is not None:
+                return lang
+        return None
+
+    def compile_solution(self, problem: str, lang: str, role: Optional[str] = None) -> Optional[Path]:
+        """编译解决方案（role 指定时编译 gen/brute 等辅助程序，产物放在 build/<问题>/<role>/）
+
+        解决方案按 self.build_profile 编译，辅助程序总是使用默认配置。
+        """
+        profile = self.DEFAULT_BUILD_PROFILE if role else self.build_profile
+        problem_dir = self.problems_dir / problem
+        source_dir = problem_dir / (role or lang)
+        
+        if not source_dir.exists():
+            self.print_error(f"源代码目录不存在: {source_dir}")
+            return None
+        
+        # 查找源文件
+        if lang not in self.SOURCE_PATTERNS:
+            self.print_error(f"不支持的语言: {lang}")
+            return None
+        
+        source_file = self.find_source_file(problem, lang, role)
+        if source_file is None:
+            self.print_error(f"在 {source_dir} 中找不到源文件")
+            return None
+        
+        # 创建构建目录（辅助程序单独存放，避免 Java 类名冲突）
+        build_problem_dir = self.build_dir / problem
+        if role:
+            build_problem_dir = build_problem_dir / role
+        build_problem_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 设置输出文件
+        if lang == "java":
+            output_file = build_problem_dir / f"{source_file.stem}.class"
+        elif lang == "python":
+            # Python不需要编译，直接返回源文件
+            self.print_success(f"Python脚本: {source_file}")
+            return source_file
         else:
-            raise ValueError(f"不支持的语言: {lang}")
+            executable_name = f"{problem}_{role or lang}"
+            if profile != self.DEFAULT_BUILD_PROFILE:
+                executable_name += f"-{profile}"
+            if platform.system() == "Windows" and not self.use_wsl:
+                executable_name += ".exe"
+            output_file = build_problem_dir / executable_name
+        
+        # 编译
+        compile_cmd = self.get_compiler_command(lang, source_file, output_file, profile)
+        if not compile_cmd:  # Python等解释型语言
+            return source_file
+            
+        self.print_info(f"编译命令: {' '.join(compile_cmd)}")
+        
+        pgo = profile == "pgo" and lang in ["cpp", "c"]
+        if pgo and not any(arg.startswith("-fprofile-use") for arg in compile_cmd):
+            self.print_warning("PGO: 没有找到与 clang 配套的 llvm-profdata，无法合并训练数据，将按普通 O2 编译")
+            pgo = False
+        cache_key = None
+        if self.build_cache is not None:
+            # PGO 产物还取决于训练数据（测试用例）
+            cache_key = self.compile_cache_key(source_file, output_file, compile_cmd,
+                                               self.training_digest(problem) if pgo else "")
+            if cache_key and self.restore_from_cache(cache_key, output_file):
+                self.print_success(f"编译缓存命中: {output_file}")
+                return output_file
+        
+        if pgo:
+            if not self.train_profile(problem, lang, source_file, output_file):
+                return None
+            profile_dir = self.profile_data_dir(output_file)
+            if any(arg.endswith(self.CLANG_PROFDATA) for arg in compile_cmd):
+                # clang 缺少 profile 数据时无法编译，改为普通 O2（train_profile 已给出警告）
+                if not (profile_dir / self.CLANG_PROFDATA).exists():
+                    compile_cmd = self.get_compiler_command(lang, source_file, output_file, "O2")
+            elif not self.has_gcc_profile(profile_dir, source_file, output_file):
+                # gcc 找不到 .gcda 时只给出编译警告（编译成功时不显示），在这里明确提示
+                self.print_warning("PGO: 没有找到与输出文件对应的 .gcda 数据，将按普通 O2 编译")
+                compile_cmd = self.get_compiler_command(lang, source_file, output_file, "O2")
+        compiled, pch_usage = self.run_compiler_with_pch(compile_cmd, lang, source_file, build_problem_dir)
+        if not compiled:
+            return None
+        if pch_usage is not None:
+            elapsed, saving = pch_usage
+            self.print_success(f"编译成功: {output_file} (耗时: {elapsed:.2f}秒, 预编译头节省约 {saving:.2f}秒)")
+        else:
+            self.print_success(f"编译成功: {output_file}")
+        if cache_key:
+            self.store_in_cache(cache_key, lang, output_file)
+        return output_file
+
+    def run_compiler_with_pch(self, compile_cmd: List[str], lang: str, source_file: Path,
+                              build_problem_dir: Path) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """优先使用预编译头编译，不可用或编译失败时透明地退回普通编译
+
+        返回 (是否编译成功, 使用预编译头时为 (编译耗时, 估计节省的秒数)，否则为 None)。
+        """
+        pch = self.prepare_pch(lang, source_file, compile_cmd)
+        if pch is not None:
+            header, saving = pch
+            pch_cmd = compile_cmd[:1] + ["-include", str(header.resolve())] + compile_cmd[1:]
+            start_time = time.perf_counter()
+            if self.run_compiler(pch_cmd, lang, build_problem_dir, report_errors=False):
+                return True, (time.perf_counter() - start_time, saving)
+            if self.run_compiler(compile_cmd, lang, build_problem_dir):
+                # 不用预编译头能编译成功，说明预编译头已损坏或不匹配，删除后下次重新生成
+                self.print_warning("预编译头不可用，已改为直接编译")
+                shutil.rmtree(str(header.parent), ignore_errors=True)
+                return True, None
+            return False, None
+        return self.run_compiler(compile_cmd, lang, build_problem_dir), None
+
+    def pch_headers(self, source_file: Path) -> List[str]:
+        """源文件开头连续的系统头文件 #include 行
+
+        遇到其他代码（宏定义、using 等）即停止，预编译的内容与源码开头完全一致，
+        不会引入源码未包含的名字，也不会改变宏与头文件的先后关系。
+        """
+        try:
+            text = source_file.read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            return []
+        headers = []
+        for line in text.splitlines():
+            stripped = line.split("//", 1)[0].strip()
+            if not stripped:
+                continue
+            directive = stripped[1:].lstrip() if stripped.startswith("#") else ""
+            if not directive.startswith("include"):
+                break
+            target = directive[len("include"):].strip()
+            if not (target.startswith("<") and target.endswith(">")):
+                break
+            headers.append(f"#include {target}")
+        return headers
+
+    def prepare_pch(self, lang: str, source_file: Path, compile_cmd: List[str]) -> Optional[Tuple[Path, float]]:
+        """查找或生成与编译命令匹配的预编译头（仅 C++），返回 (头文件路径, 估计节省的秒数)
+
+        编译参数中与输出路径相关的 -fprofile-* 不影响预编译头，不计入键。
+        """
+        if lang != "cpp" or self.pch_cache is None or "-o" not in compile_cmd:
+            return None
+        headers = self.pch_headers(source_file)
+        if not headers:
+            return None
+        compiler = compile_cmd[0]
+        flags = [arg for arg in compile_cmd[1:compile_cmd.index("-o")] if not arg.startswith("-fprofile")]
+        key = BuildCache.make_key(self.get_compiler_version([compiler]), "\0".join(flags), "\n".join(headers))
+        entry = self.pch_cache.lookup(key)
+        if entry is None:
+            if key in self.pch_failures:
+                return None
+            entry = self.build_pch_once(key, compiler, flags, headers)
+            if entry is None:
+                self.pch_failures.add(key)
+                return None
+        try:
+            with open(entry / f"{self.PCH_HEADER}.json", 'r', encoding='utf-8') as f:
+                saving = float(json.load(f)["saving"])
+        except (OSError, ValueError, KeyError, TypeError):
+            saving = 0.0
+        return entry / self.PCH_HEADER, saving
+
+    def build_pch_once(self, key: str, compiler: str, flags: List[str], headers: List[str]) -> Optional[Path]:
+        """通过锁文件保证同一预编译头只由一个进程生成（--problem-jobs 时），其他进程等待其完成"""
+        self.pch_cache.cache_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = self.pch_cache.cache_dir / f".{key[:16]}.lock"
+        deadline = time.monotonic() + 300
+        while True:
+            try:
+                os.close(os.open(str(lock_file), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                pass
+            except OSError:
+                return self.build_pch(key, compiler, flags, headers)
+            entry = self.pch_cache.lookup(key)
+            if entry is not None:
+                return entry
+            try:
+                # 持有锁的进程异常退出时，锁文件过期后接手生成
+                stale = time.time() - lock_file.stat().st_mtime > 300
+            except OSError:
+                continue
+            if stale or time.monotonic() > deadline:
+                return None
+            time.sleep(0.1)
+        try:
+            return self.pch_cache.lookup(key) or self.build_pch(key, compiler, flags, headers)
+        finally:
+            try:
+                lock_file.unlink()
+            except OSError:
+                pass
+
+    def build_pch(self, key: str, compiler: str, flags: List[str], headers: List[str]) -> Optional[Path]:
+        """生成预编译头并存入 build/pch/<键>/
+
+        同时测量直接解析这些头文件与加载预编译头的耗时，两者之差作为每次编译节省时间的估计。
+        """
+        self.pch_cache.cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:16]}-", dir=str(self.pch_cache.cache_dir)))
+        try:
+            header = staging / self.PCH_HEADER
+            header.write_text("\n".join(headers) + "\n", encoding='utf-8')
+            build = self.run_command([compiler] + flags + ["-x", "c++-header", str(header), "-o", f"{header}.gch"],
+                                     timeout=120)
+            build_time = build['time']
+            if build['returncode'] != 0 or build['timed_out']:
+                self.print_warning("生成预编译头失败，改为直接编译")
+                return None
+
+            def syntax_check_time(args: List[str]) -> float:
+                return self.run_command([compiler] + flags + ["-fsyntax-only"] + args, timeout=120)['time']
+
+            parse_time = syntax_check_time(["-x", "c++", str(header)])
+            load_time = syntax_check_time(["-include", str(header), "-x", "c++", os.devnull])
+            saving = max(parse_time - load_time, 0.0)
+            with open(staging / f"{self.PCH_HEADER}.json", 'w', encoding='utf-8') as f:
+                json.dump({"headers": headers, "flags": flags, "saving": saving}, f, ensure_ascii=False, indent=2)
+            self.pch_cache.store(key, [header, Path(f"{header}.gch"), staging / f"{self.PCH_HEADER}.json"])
+        except OSError as e:
+            self.print_warning(f"生成预编译头失败，改为直接编译: {e}")
+            return None
+        finally:
+            shutil.rmtree(str(staging), ignore_errors=True)
+        self.print_info(f"已生成预编译头 ({', '.join(h.split()[-1] for h in headers)}，{build_time:.2f}秒)，"
+                        f"每次编译约节省 {saving:.2f}秒")
+        return self.pch_cache.lookup(key)
+
+    def run_compiler(self, compile_cmd: List[str], lang: str, build_problem_dir: Path,
+                     report_errors: bool = True) -> bool:
+        """执行编译命令，失败时打印编译器输出（report_errors 为 False 时不打印）"""
+        try:
+            result = self.run_command(compile_cmd, timeout=30, cwd=build_problem_dir if lang == "java" else None)
+            
+            if result['timed_out']:
+                if report_errors:
+                    self.print_error("编译超时")
+                return False
+            if result['returncode'] != 0:
+                if report_errors:
+                    self.print_error("编译失败:")
+                    if result['stderr']:
+                        print(f"{Colors.RED}{result['stderr']}{Colors.END}")
+                return False
+            return True
+            
+        except FileNotFoundError:
+            if not report_errors:
+                return False
+            self.print_error(f"编译器未找到。请确保已安装 {lang} 编译器")
+            if not self.use_wsl and platform.system() == "Windows":
+                self.print_info("提示: 在Windows上可以尝试使用 --wsl 选项")
+                self.print_info("或者安装 MinGW-w64 或 Visual Studio Build Tools")
+                self.print_info("推荐下载: https://www.mingw-w64.org/downloads/")
+                self.print_info("或者使用打包版本（包含编译器）")
+            return False
+
+    @staticmethod
+    def profile_data_dir(output_file: Path) -> Path:
+        """PGO 训练数据(.gcda 或 .profraw/.profdata)目录；gcc 按输出文件名命名数据文件，插桩版本与最终版本使用同一输出路径"""
+        return output_file.parent / f".pgo-{output_file.name}"
+
+    def is_clang(self, compiler: str) -> bool:
+        """编译器是否为 clang（包括 macOS 上名为 gcc/g++ 的 Apple clang），依据其版本信息判断"""
+        return "clang version" in self.get_compiler_version([compiler]).split('\n', 1)[-1]
+
+    def find_llvm_profdata(self, compiler: str) -> Optional[List[str]]:
+        """查找与 clang 配套的 llvm-profdata 命令（优先使用同一主版本），找不到时返回 None"""
+        version = self.get_compiler_version([compiler])
+        major = version.split("clang version ", 1)[-1].split('.', 1)[0] if "clang version " in version else ""
+        candidates = [[f"llvm-profdata-{major}"]] if major.isdigit() else []
+        candidates += [["llvm-profdata"], ["xcrun", "llvm-profdata"]]
+        for command in candidates:
+            # 旧版本的 llvm-profdata 只在子命令下支持 --version
+            if self.compiler_detector.probe(command + ["merge", "--version"]) is not None:
+                return command
+        return None
+
+    def training_digest(self, problem: str) -> str:
+        """PGO 训练数据的摘要：问题目录中除各语言源码和 gen/brute 以外文件的 (路径, 修改时间, 大小)"""
+        excluded = set(self.SOURCE_PATTERNS) | {"gen", "brute"}
+        entries = sorted((str(path), stat) for path, stat in self.snapshot_problem(problem).items()
+                         if len(path.parts) == 1 or path.parts[0] not in excluded)
+        return json.dumps(entries)
+
+    def train_profile(self, problem: str, lang: str, source_file: Path, output_file: Path) -> bool:
+        """PGO 训练：编译插桩版本，以问题自身的测试用例为负载运行一遍，生成 profile 数据"""
+        profile_dir = self.profile_data_dir(output_file)
+        shutil.rmtree(str(profile_dir), ignore_errors=True)
+        # 插桩版本会覆盖输出文件，先作废其缓存标记
+        try:
+            (output_file.parent / f".{output_file.name}.key").unlink()
+        except OSError:
+            pass
+        training_cmd = self.get_compiler_command(lang, source_file, output_file, "pgo", training=True)
+        self.print_info(f"PGO: 编译插桩版本: {' '.join(training_cmd)}")
+        if not self.run_compiler_with_pch(training_cmd, lang, source_file, output_file.parent)[0]:
+            return False
+        try:
+            test_cases = self.load_test_cases(self.problems_dir / problem)
+        except Exception as e:
+            self.print_error(f"加载测试用例失败: {e}")
+            return False
+
+        start_time = time.perf_counter()
+        # 各用例写入 .gcda 时由 libgcov 加锁合并，可以并发运行；训练时的输出直接丢弃
+        results = self.run_programs([(lang, output_file, [], test_case.get("input", ""), test_case.get("input_file"),
+                                      0, Path(os.devnull)) for test_case in test_cases])
+        count = len(results)
+        failed = sum(1 for result in results if result['error'] or result['timed_out'] or result['returncode'] != 0)
+        if failed:
+            self.print_warning(f"PGO: {failed} 个训练用例运行失败，profile 数据可能不完整")
+        if training_cmd[0] != "wsl" and self.is_clang(training_cmd[0]):
+            self.merge_clang_profile(training_cmd[0], profile_dir)
+        self.print_info(f"PGO: 用 {count} 个测试用例完成训练 ({time.perf_counter() - start_time:.3f}秒)")
+        return True
+
+    @staticmethod
+    def has_gcc_profile(profile_dir: Path, source_file: Path, output_file: Path) -> bool:
+        """profile 目录中是否有 gcc 为该输出文件生成的 .gcda
+
+        文件名为 <输出路径>-<源文件名>.gcda（新版 gcc 把完整输出路径中的 / 替换为 #），
+        输出路径与训练时不同就读取不到，因此只按结尾匹配。
+        """
+        suffix = f"{output_file.name}-{source_file.stem}.gcda"
+        return profile_dir.is_dir() and any(path.name.endswith(suffix) for path in profile_dir.glob("*.gcda"))
+
+    def merge_clang_profile(self, compiler: str, profile_dir: Path):
+        """用 llvm-profdata 把 clang 训练生成的 .profraw 合并为 CLANG_PROFDATA，失败时给出警告"""
+        raw_files = sorted(str(path) for path in profile_dir.glob("*.profraw")) if profile_dir.is_dir() else []
+        if not raw_files:
+            self.print_warning("PGO: 没有生成 profile 数据，将按普通 O2 编译")
+            return
+        command = self.find_llvm_profdata(compiler) + ["merge", f"-output={profile_dir / self.CLANG_PROFDATA}"]
+        try:
+            result = self.run_command(command + raw_files, timeout=60)
+        except OSError as e:
+            result = {'returncode': -1, 'stderr': str(e)}
+        if result['returncode'] != 0:
+            self.print_warning(f"PGO: 合并 profile 数据失败，将按普通 O2 编译:\n{result['stderr'].strip()}")
+
+    def get_compiler_version(self, compiler_cmd: List[str]) -> str:
+        """获取编译器路径和版本信息（本地编译器的结果缓存在磁盘上）"""
+        key = tuple(compiler_cmd)
+        if key not in self.compiler_versions:
+            compiler_path = shutil.which(compiler_cmd[0]) or compiler_cmd[0]
+            # WSL 内的编译器无法通过 wsl 可执行文件的修改时间判断是否变化，不做磁盘缓存
+            version = self.compiler_detector.probe(compiler_cmd + ["--version"],
+                                                   use_cache=compiler_cmd[0] != "wsl")
+            self.compiler_versions[key] = f"{compiler_path}\n{version or ''}"
+        return self.compiler_versions[key]
+
+    def compile_cache_key(self, source_file: Path, output_file: Path, compile_cmd: List[str],
+                          extra: str = "") -> Optional[str]:
+        """根据源码内容、编译器路径/版本和编译参数计算缓存键（extra 为其他影响产物的数据，如 PGO 训练数据）"""
+        try:
+            source_bytes = source_file.read_bytes()
+        except OSError:
+            return None
+        # 编译命令中的源文件/输出路径与缓存内容无关，替换为占位符
+        placeholders = {}
+        for path, name in ((source_file, "<source>"), (output_file, "<output>"), (output_file.parent, "<outdir>")):
+            for variant in (str(path), str(path.resolve()), str(path).replace('\\', '/').replace('E:', '/mnt/e')):
+                placeholders[variant] = name
+        normalized_cmd = [placeholders.get(arg, arg) for arg in compile_cmd]
+        compiler_index = 1 if compile_cmd[0] == "wsl" else 0
+        compiler_version = self.get_compiler_version(compile_cmd[:compiler_index + 1])
+        if extra:
+            return BuildCache.make_key(source_bytes, compiler_version, "\0".join(normalized_cmd), extra)
+        return BuildCache.make_key(source_bytes, compiler_version, "\0".join(normalized_cmd))
+
+    def restore_from_cache(self, cache_key: str, output_file: Path) -> bool:
+        """从编译缓存恢复产物；构建目录中已是同一份产物时不再复制"""
+        stamp_file = output_file.parent / f".{output_file.name}.key"
+        try:
+            if output_file.exists() and stamp_file.read_text(encoding='utf-8') == cache_key:
+                self.build_cache.lookup(cache_key)
+                return True
+        except OSError:
+            pass
+        try:
+            restored = self.build_cache.restore(cache_key, output_file.parent)
+        except OSError:
+            return False
+        if not restored or not output_file.exists():
+            return False
+        stamp_file.write_text(cache_key, encoding='utf-8')
+        return True
+
+    def store_in_cache(self, cache_key: str, lang: str, output_file: Path):
+        """将编译产物写入缓存"""
+        if lang == "java":
+            # 一个源文件可能生成多个类文件（内部类等）
+            artifacts = list(output_file.parent.glob("*.class"))
+        else:
+            artifacts = [output_file]
+        try:
+            self.build_cache.store(cache_key, artifacts)
+            (output_file.parent / f".{output_file.name}.key").write_text(cache_key, encoding='utf-8')
+        except OSError as e:
+            self.print_warning(f"写入编译缓存失败: {e}")
+
+    def run_single_test(self, executable: Path, lang: str, test_input: str,
+                        input_file: Optional[Path] = None) -> Tuple[bool, str, str, float]:
+        """运行单个测试用例（指定 input_file 时直接以文件作为标准输入）
+
+        保留的简单接口，通过 run_program 在 asyncio 运行器上执行；返回 (是否成功, 输出, 错误信息, 耗时)。
+        """
+        result = self.run_program(lang, executable, [], test_input, input_file)
+        if result['error']:
+            return False, "", result['error'], 0.0
+        if result['timed_out']:
+            return False, "", f"超时 (>{self.timeout}秒)", result['time']
+        if result['output_exceeded']:
+            return False, "", f"输出超限 (限制: {self.output_limit}MB)", result['time']
+        if result['returncode'] != 0:
+            return False, "", f"运行时错误 (退出码: {result['returncode']})\n{result['stderr']}", result['time']
+        return True, result['stdout'], result['stderr'], result['time']
+
+    def run_program(self, lang: str, executable: Path, args: List[str], input_text: str = '',
+                    input_file: Optional[Path] = None, memory_limit: int = 0,
+                    output_file: Optional[Path] = None) -> Dict:
+        """运行程序并收集完整输出（不与期望输出比较），用于辅助程序和测量
+
+        与被评测程序一样通过 start_process 启动（Python 由预热执行器 fork），但为了更快地创建进程
+        不测量峰值内存。标准输出超过输出限制时立即结束程序；指定 output_file 时标准输出直接写入该文件
+        （不受输出限制，结果中 stdout 为空），用于可能很大的生成数据。
+        返回结果字典: returncode, stdout, stderr, timed_out, output_exceeded, time, cpu_time,
+        memory（总是 None）, error（无法启动时的错误信息）。
+        """
+        return self.run_programs([(lang, executable, args, input_text, input_file, memory_limit, output_file)],
+                                 jobs=1)[0]
+
+    def run_programs(self, requests: List[Tuple], jobs: Optional[int] = None) -> List[Dict]:
+        """并发运行多个程序（最多 jobs 个同时运行，默认 --jobs），参数与结果同 run_program，按顺序返回"""
+        runner = AsyncProcessRunner(jobs or self.jobs)
+        return runner.run_all([self.run_program_async(runner, *request) for request in requests])
+
+    async def run_program_async(self, runner: AsyncProcessRunner, lang: str, executable: Path, args: List[str],
+                                input_text: str = '', input_file: Optional[Path] = None,
+                                memory_limit: int = 0, output_file: Optional[Path] = None,
+                                output_limit: Optional[int] = None, exact_memory: bool = False) -> Dict:
+        """在 runner 的事件循环中运行一个程序（见 run_program）
+
+        output_limit 为输出限制(MB)，默认使用 self.output_limit；exact_memory 时像被评测程序一样测量峰值内存。
+        """
+        result = {'returncode': -1, 'stdout': '', 'stderr': '', 'timed_out': False, 'output_exceeded': False,
+                  'time': 0.0, 'cpu_time': None, 'memory': None, 'error': None}
+        run_cmd = self.get_run_command(lang, executable) + args
+        try:
+            stdin_file = open(input_file, 'rb') if input_file else None
+        except OSError as e:
+            result['error'] = f"无法读取输入文件: {e}"
+            return result
+        try:
+            stdout_file = open(output_file, 'wb') if output_file else None
+        except OSError as e:
+            if stdin_file:
+                stdin_file.close()
+            result['error'] = f"无法写入输出文件: {e}"
+            return result
+        if lang == "python":
+            # 预热执行器的启动时间不计入程序耗时
+            self.get_fork_server()
+        leased = []
+
+        def spawn():
+            # 在 runner 的并发限制内才占用 CPU；并发数不超过核心数，通常总有空闲 CPU，
+            # 拿不到时（如与评测线程同时运行）不绑定
+            cpu = self.cpu_scheduler.acquire(blocking=False) if self.cpu_scheduler is not None else None
+            if cpu is not None:
+                leased.append(cpu)
+            return self.start_process(lang, executable, run_cmd, stdin_file, memory_limit, args,
+                                      exact_memory=exact_memory, cpu=cpu)
+
+        if output_limit is None:
+            output_limit = self.output_limit
+        try:
+            outcome = await runner.run(spawn, None if stdin_file else input_text.encode('utf-8'), self.timeout,
+                                       0 if stdout_file else output_limit * 1024 * 1024, stdout_file)
+        except OSError as e:
+            result['error'] = f"无法启动程序: {e}"
+            return result
+        finally:
+            if stdin_file:
+                stdin_file.close()
+            if stdout_file:
+                stdout_file.close()
+            for cpu in leased:
+                self.cpu_scheduler.release(cpu)
+        result.update(returncode=outcome['returncode'], timed_out=outcome['timed_out'],
+                      output_exceeded=outcome['output_exceeded'], time=outcome['time'], cpu_time=outcome['cpu_time'],
+                      memory=outcome['memory'] if exact_memory else None,
+                      stdout=outcome['stdout'].decode('utf-8', errors='replace'), stderr=outcome['stderr'])
+        return result
+
+    def run_command(self, command: List[str], timeout: float, cwd: Optional[Path] = None) -> Dict:
+        """运行编译器等工具命令，超时时结束整个进程组（如 g++ 派生的 cc1plus、ld）
+
+        启动失败时抛出 OSError（如 FileNotFoundError）；返回结果同 AsyncProcessRunner.run，
+        stdout 已解码为文本。
+        """
+        runner = AsyncProcessRunner()
+
+        def spawn():
+            popen = subprocess.Popen(
+                command, cwd=str(cwd) if cwd else None, stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, **PROCESS_GROUP_OPTIONS)
+            self.set_child_affinity(popen.pid, None)
+            return RunningProcess(popen)
+
+        result = runner.run_all([runner.run(spawn, None, timeout)])[0]
+        result['stdout'] = result['stdout'].decode('utf-8', errors='replace')
+        return result
+
+    @contextlib.contextmanager
+    def cpu_lease(self, blocking: bool = True):
+        """在 with 块中独占一个 CPU（未启用 CPU 绑定或 blocking 为 False 且没有空闲 CPU 时为 None）"""
+        cpu = self.cpu_scheduler.acquire(blocking) if self.cpu_scheduler is not None else None
+        try:
+            yield cpu
+        finally:
+            if cpu is not None:
+                self.cpu_scheduler.release(cpu)
+
+    def child_cpus(self, cpu: Optional[int]):
+        """子进程应绑定的 CPU 集合：独占的 CPU，或保留评测核心时的其余 CPU；无需设置时为 None"""
+        if cpu is not None:
+            return {cpu}
+        if self.cpu_scheduler is not None and self.cpu_scheduler.judge_cpu is not None:
+            return self.cpu_scheduler.shared_cpus
+        return None
+
+    def set_child_affinity(self, pid: int, cpu: Optional[int]):
+        """进程启动后立即设置其 CPU 亲和性（已退出时忽略）"""
+        cpus = self.child_cpus(cpu)
+        if cpus is not None:
+            try:
+                os.sched_setaffinity(pid, cpus)
+            except OSError:
+                pass
+
+    def get_cgroup_sandbox(self) -> Optional[CgroupSandbox]:
+        """获取（首次需要时创建）cgroup 隔离环境，不可用时返回 None，改用 rlimit 限制"""
+        with self.cgroup_lock:
+            if self.use_cgroup and self.cgroup_sandbox is None:
+                try:
+                    self.cgroup_sandbox = CgroupSandbox.setup()
+                    self.cgroup_status = f"cgroup v2 ({self.cgroup_sandbox.root})"
+                except OSError as e:
+                    self.use_cgroup = False
+                    self.cgroup_status = f"rlimit (cgroup 不可用: {e})"
+            return self.cgroup_sandbox
+
+    def create_cgroup(self, lang: str, memory_limit: int) -> Optional[Cgroup]:
+        """为一次运行创建 cgroup，不可用时返回 None
+
+        Java 的堆大小已由 -Xmx 限制，JVM 自身还需要额外内存，因此不设置 memory.max。
+        """
+        sandbox = self.get_cgroup_sandbox()
+        if sandbox is None:
+            return None
+        try:
+            return sandbox.create(memory_limit * 1024 * 1024 if lang != "java" else 0)
+        except OSError as e:
+            self.print_warning(f"创建 cgroup 失败，本次改用 rlimit 限制: {e}")
+            return None
+
+    def resource_limits(self, lang: str, memory_limit: int,
+                        in_cgroup: bool = False) -> List[Tuple[int, Tuple[int, int]]]:
+        """被评测程序的资源限制列表 [(资源, (软限制, 硬限制))]（仅 POSIX）
+
+        in_cgroup 时内存由 cgroup 的 memory.max 按实际占用限制，不再限制地址空间。
+        """
+        if resource is None:
+            return []
+        # CPU 时间限制只是兜底，正常情况下墙钟超时会先生效
+        cpu_limit = int(self.timeout) + 1
+        limits = [(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))]
+        # JVM 和 AddressSanitizer 会预留大量虚拟内存，Java 通过 -Xmx 限制堆大小，
+        # debug 配置的 C/C++ 程序只按峰值内存判定内存超限
+        sanitized = self.build_profile == "debug" and lang in ["cpp", "c"]
+        if memory_limit and lang != "java" and not sanitized and not in_cgroup:
+            address_limit = memory_limit * 1024 * 1024
+            limits.append((resource.RLIMIT_AS, (address_limit, address_limit)))
+        return limits
+
+    def make_preexec(self, lang: str, memory_limit: int, cgroup: Optional[Cgroup] = None,
+                     cpu: Optional[int] = None):
+        """生成在子进程 exec 前加入 cgroup、绑定 CPU 并设置资源限制的函数（仅 POSIX）"""
+        limits = self.resource_limits(lang, memory_limit, cgroup is not None)
+        cpus = self.child_cpus(cpu)
+        if not limits and cgroup is None and cpus is None:
+            return None
+        procs_file = cgroup.procs_file if cgroup is not None else None
+
+        def preexec():
+            if cpus is not None:
+                os.sched_setaffinity(0, cpus)
+            if procs_file is not None:
+                with open(procs_file, 'w') as f:
+                    f.write("0")
+            for limit, values in limits:
+                resource.setrlimit(limit, values)
+
+        return preexec
+
+    def get_memory_launcher(self) -> Optional[Path]:
+        """获取（首次需要时编译）测量峰值内存的启动器，不可用时返回 None"""
+        with self.memory_launcher_lock:
+            if self.memory_launcher is None:
+                self.memory_launcher = self.prepare_memory_launcher() or False
+            return self.memory_launcher or None
+
+    def prepare_memory_launcher(self) -> Optional[Path]:
+        """编译 MemoryLauncher（按源码和编译器版本缓存在构建目录中），没有 C 编译器或编译失败时返回 None"""
+        compiler = self.get_compiler("c")
+        if not compiler:
+            self.print_warning("没有找到 C 编译器，无法测量峰值内存，只通过资源限制判定内存超限")
+            return None
+        key = BuildCache.make_key(MemoryLauncher.SOURCE, self.get_compiler_version([compiler]))
+        launcher = (self.build_dir / ".launcher" / key[:16] / MemoryLauncher.NAME).resolve()
+        if launcher.exists():
+            return launcher
+
+        # 先编译到临时目录再原子重命名，可供多个评测进程同时使用
+        launcher.parent.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=str(launcher.parent.parent)))
+        try:
+            source_file = staging / f"{MemoryLauncher.NAME}.c"
+            source_file.write_text(MemoryLauncher.SOURCE, encoding='utf-8')
+            result = self.run_command([compiler, "-O2", "-o", str(staging / MemoryLauncher.NAME), str(source_file)],
+                                      timeout=60)
+            if result['returncode'] != 0:
+                self.print_warning(f"编译峰值内存启动器失败:\n{result['stderr'].strip()}")
+                return None
+            source_file.unlink()
+            os.replace(str(staging), str(launcher.parent))
+        except OSError as e:
+            if not launcher.exists():
+                self.print_warning(f"准备峰值内存启动器失败: {e}")
+                return None
+        finally:
+            shutil.rmtree(str(staging), ignore_errors=True)
+        return launcher
+
+    def popen_limited(self, lang: str, memory_limit: int, run_cmd: List[str], exact_memory: bool = True,
+                      cgroup: Optional[Cgroup] = None, cpu: Optional[int] = None, **kwargs) -> subprocess.Popen:
+        """创建带资源限制的子进程（在 exec 前加入 cgroup 并设置限制）
+
+        exact_memory 为 False 时（不关心峰值内存的辅助程序），Linux 上改为启动后立即用 prlimit 设置限制：
+        不使用 preexec_fn 时 subprocess 可以用 vfork/posix_spawn 创建进程，省去复制评测器地址空间的开销
+        （每个进程约 1-2 毫秒）。代价是内核把评测器自身的常驻内存计入子进程的峰值内存，
+        cgroup 也在启动后才加入，之前的极短时间内的用量不计入 cgroup。
+        """
+        if not exact_memory and resource is not None and hasattr(resource, 'prlimit'):
+            popen = subprocess.Popen(run_cmd, **PROCESS_GROUP_OPTIONS, **kwargs)
+            self.set_child_affinity(popen.pid, cpu)
+            in_cgroup = cgroup is not None
+            try:
+                if in_cgroup:
+                    cgroup.add(popen.pid)
+            except OSError:
+                # 进程已经退出或无法移入：不使用 cgroup 的统计
+                in_cgroup = False
+                cgroup.usage = (None, None, False, False)
+                CgroupSandbox.remove(cgroup.path, timeout=0)
+            try:
+                for limit, values in self.resource_limits(lang, memory_limit, in_cgroup):
+                    resource.prlimit(popen.pid, limit, values)
+            except OSError:
+                pass  # 进程已经退出
+            return popen
+        return subprocess.Popen(run_cmd, preexec_fn=self.make_preexec(lang, memory_limit, cgroup, cpu),
+                                **PROCESS_GROUP_OPTIONS, **kwargs)
+
+    def start_process(self, lang: str, executable: Path, run_cmd: List[str], stdin_file, memory_limit: int,
+                      args: List[str] = (), exact_memory: bool = True, cpu: Optional[int] = None):
+        """启动被评测程序，Python 优先交给预热执行器 fork，其余语言直接创建子进程
+
+        args 为程序的命令行参数，需已包含在 run_cmd 末尾（预热执行器单独传递）；
+        exact_memory 为 False 时允许以峰值内存不准确为代价更快地创建进程（见 popen_limited）。
+        cgroup 可用时每次运行放在新建的 cgroup 中，否则 exact_memory 时经 MemoryLauncher 启动；
+        cpu 为程序独占的 CPU（见 CpuScheduler）。
+        """
+        server = self.get_fork_server() if lang == "python" else None
+        cgroup = self.create_cgroup(lang, memory_limit)
+        try:
+            if server is not None:
+                try:
+                    return self.start_forked_process(server, executable, stdin_file, memory_limit, args,
+                                                     cgroup, cpu)
+                except OSError as e:
+                    self.print_warning(f"预热执行器运行失败，改为直接启动解释器: {e}")
+            usage_pipe = None
+            launcher = self.get_memory_launcher() if exact_memory and cgroup is None else None
+            if launcher is not None:
+                usage_pipe, usage_w = os.pipe()
+                run_cmd = [str(launcher), str(usage_w)] + run_cmd
+            try:
+                popen = self.popen_limited(
+                    lang, memory_limit, run_cmd, exact_memory, cgroup, cpu,
+                    stdin=stdin_file or subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    pass_fds=(usage_w,) if usage_pipe is not None else ()
+                )
+            except BaseException:
+                if usage_pipe is not None:
+                    os.close(usage_pipe)
+                raise
+            finally:
+                if usage_pipe is not None:
+                    os.close(usage_w)
+            return RunningProcess(popen, cgroup, usage_pipe)
+        except BaseException:
+            if cgroup is not None:
+                CgroupSandbox.remove(cgroup.path)
+            raise
+
+    def start_forked_process(self, server: PythonForkServer, script: Path, stdin_file,
+                             memory_limit: int, args: List[str] = (),
+                             cgroup: Optional[Cgroup] = None, cpu: Optional[int] = None) -> ForkServerProcess:
+        """通过预热执行器运行 Python 脚本，管道的另一端交给 fork 出的子进程"""
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        if stdin_file:
+            stdin_r, stdin_w = stdin_file.fileno(), None
+        else:
+            stdin_r, stdin_w = os.pipe()
+        try:
+            child = server.spawn(script, stdin_r, stdout_w, stderr_w,
+                                 cpu_limit=int(self.timeout) + 1,
+                                 address_limit=memory_limit * 1024 * 1024 if cgroup is None else 0,
+                                 args=args, cgroup=cgroup, cpus=self.child_cpus(cpu))
+        except OSError:
+            for fd in (stdout_r, stderr_r, stdin_w):
+                if fd is not None:
+                    os.close(fd)
+            raise
+        finally:
+            # 子进程已通过套接字拿到副本，本进程只保留自己这一端
+            for fd in (stdout_w, stderr_w, None if stdin_file else stdin_r):
+                if fd is not None:
+                    os.close(fd)
+        child.stdout = open(stdout_r, 'rb')
+        child.stderr = open(stderr_r, 'rb')
+        child.stdin = open(stdin_w, 'wb') if stdin_w is not None else None
+        return child
+
+    def judge_case(self, executable: Path, lang: str, test_case: Dict, memory_limit: int = 0,
+                   output_limit: int = 0, cpu: Optional[int] = None) -> Dict:
+        """运行并评测单个测试用例
+
+        边读取程序输出边与期望输出逐行比较，发现第一处不同时立即结束程序，
+        不必等待程序运行完毕，也不在内存中保留完整输出；标准错误只保留最后 DISPLAY_LIMIT 字节。
+        memory_limit/output_limit 为内存/输出限制(MB)，0 表示不限制，输出超限时立即结束程序；
+        cpu 为程序独占的 CPU。
+        逐行比较（find_mismatch）需要按需拉取输出，因此不经过 AsyncProcessRunner，而是在调用线程中
+        直接读取标准输出，标准错误和标准输入各用一个辅助线程；并发由 execute_test_cases 的线程池控制。
+        返回结果字典: verdict, time, cpu_time, memory, output（用于显示的输出前缀）, error, mismatch。
+        """
+        result = {'verdict': Verdict.AC, 'time': 0.0, 'cpu_time': None, 'memory': None,
+                  'output': '', 'error': '', 'mismatch': None}
+        run_cmd = self.get_run_command(lang, executable)
+        if lang == "java" and memory_limit:
+            run_cmd = run_cmd[:1] + [f"-Xmx{memory_limit}m"] + run_cmd[1:]
+        input_file = test_case.get("input_file")
+        expected_file = test_case.get("output_file")
+
+        try:
+            stdin_file = open(input_file, 'rb') if input_file else None
+        except OSError as e:
+            result.update(verdict=Verdict.RE, error=f"无法读取输入文件: {e}")
+            return result
+
+        if lang == "python":
+            # 预热执行器的启动时间不计入第一个用例
+            self.get_fork_server()
+        elif self.get_cgroup_sandbox() is None:
+            # 同样，首次使用时编译峰值内存启动器的时间也不计入
+            self.get_memory_launcher()
+        start_time = time.perf_counter()
+        try:
+            process = self.start_process(lang, executable, run_cmd, stdin_file, memory_limit, cpu=cpu)
+        except OSError as e:
+            if stdin_file:
+                stdin_file.close()
+            result.update(verdict=Verdict.RE, error=f"无法启动程序: {e}")
+            return result
+
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(self.timeout, kill_on_timeout)
+        timer.daemon = True
+        timer.start()
+
+        stderr_tail = TailBuffer(self.DISPLAY_LIMIT)
+
+        def drain_stderr():
+            for chunk in iter(lambda: process.stderr.read1(self.CHUNK_SIZE), b''):
+                stderr_tail.append(chunk)
+
+        helpers = [threading.Thread(target=drain_stderr, daemon=True)]
+        if stdin_file is None:
+            helpers.append(threading.Thread(target=self.feed_stdin, daemon=True,
+                                            args=(process, test_case.get("input", ""))))
+        for helper in helpers:
+            helper.start()
+
+        display = []
+        display_size = [0]
+        output_size = [0]
+        output_limit_bytes = output_limit * 1024 * 1024
+        stdout_closed = threading.Event()
+        output_exceeded = threading.Event()
+        killed_early = False
+
+        def read_chunk():
+            """从管道读取一块输出，同时保留有限长度用于显示；输出超限时视为输出结束"""
+            chunk = process.stdout.read1(self.CHUNK_SIZE)
+            if not chunk:
+                stdout_closed.set()
+            output_size[0] += len(chunk)
+            if output_limit_bytes and output_size[0] > output_limit_bytes:
+                output_exceeded.set()
+                return b''
+            if display_size[0] < self.DISPLAY_LIMIT:
+                display.append(chunk[:self.DISPLAY_LIMIT - display_size[0]])
+                display_size[0] += len(display[-1])
+            return chunk
+
+        mismatch = None
+        try:
+            if expected_file:
+                expected_blocks = iter_file_line_blocks(expected_file)
+            else:
+                expected_blocks = [test_case.get("output", "").split('\n')]
+            mismatch = find_mismatch(expected_blocks, iter_line_blocks(read_chunk))
+        except OSError as e:
+            result['error'] = f"无法读取期望输出文件: {e}"
+        finally:
+            if not stdout_closed.is_set():
+                # 输出尚未结束但已经确定结果，不再等待程序运行结束
+                killed_early = True
+                process.kill()
+            returncode, result['cpu_time'], result['memory'] = process.wait()
+            result['time'] = time.perf_counter() - start_time
+            timer.cancel()
+            process.stdout.close()
+            for helper in helpers:
+                helper.join()
+            process.stderr.close()
+            if stdin_file:
+                stdin_file.close()
+
+        result['output'] = b''.join(display).decode('utf-8', errors='replace')
+        stderr = stderr_tail.text()
+        memory_limit_bytes = memory_limit * 1024 * 1024
+        out_of_memory = memory_limit and (
+            (result['memory'] or 0) > memory_limit_bytes or process.oom_killed
+            or (returncode != 0 and any(marker in stderr for marker in self.OUT_OF_MEMORY_MARKERS)))
+        if timed_out.is_set():
+            result.update(verdict=Verdict.TLE, error=f"超时 (>{self.timeout}秒)")
+        elif output_exceeded.is_set():
+            result.update(verdict=Verdict.OLE, error=f"输出超限 (限制: {output_limit}MB)")
+        elif out_of_memory:
+            result.update(verdict=Verdict.MLE, error=f"内存超限 (限制: {memory_limit}MB)")
+        elif result['error']:
+            result['verdict'] = Verdict.RE
+        elif returncode != 0 and not killed_early:
+            # 程序自行异常退出时，运行时错误优先于输出不匹配
+            reason = f"退出码: {returncode}"
+            if process.pids_exceeded:
+                reason += f", 进程/线程数达到上限 {CgroupSandbox.PIDS_MAX}"
+            result.update(verdict=Verdict.RE, error=f"运行时错误 ({reason})\n{stderr}")
+        elif mismatch is not None:
+            result.update(verdict=Verdict.WA, mismatch=mismatch)
+        return result
+
+    @staticmethod
+    def format_usage(result: Dict) -> str:
+        """格式化耗时、CPU时间和峰值内存"""
+        parts = [f"耗时: {result['time']:.3f}秒"]
+        if result.get('cpu_time') is not None:
+            parts.append(f"CPU: {result['cpu_time']:.3f}秒")
+        if result.get('memory') is not None:
+            parts.append(f"内存: {result['memory'] / (1024 * 1024):.1f}MB")
+        return ", ".join(parts)
+
+    @staticmethod
+    def describe_line(line: Optional[str], column: int, width: int = 60) -> str:
+        """显示不匹配的行，过长时只截取不同之处附近的内容"""
+        if line is None:
+            return "(输出已结束)"
+        if len(line) <= width:
+            return repr(line)
+        start = max(column - 1 - width // 2, 0)
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if start + width < len(line) else ""
+        return prefix + repr(line[start:start + width]) + suffix
+
+    @staticmethod
+    def feed_stdin(process: subprocess.Popen, test_input: str):
+        """向子进程写入标准输入（程序提前退出或被结束时忽略管道错误）"""
+        try:
+            process.stdin.write(test_input.encode('utf-8'))
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
 
-    def compile_solution(self, problem: str, lang: str) -> Optional[Path]:
-        """编译解决方案"""
-        problem_dir = self.problems_dir / problem
-        source_dir = problem_dir / lang
-        
-        if not source_dir.exists():
-            self.print_error(f"源代码目录不存在: {source_dir}")
-            return None
-        
-        # 查找源文件
-        if lang == "cpp":
-            source_files = list(source_dir.glob("*.cpp"))
-        elif lang == "c":
-            source_files = list(source_dir.glob("*.c"))
-        elif lang == "java":
-            source_files = list(source_dir.glob("*.java"))
-        elif lang == "python":
-            source_files = list(source_dir.glob("*.py"))
-        else:
-            self.print_error(f"不支持的语言: {lang}")
-            return None
-        
-        if not source_files:
-            self.print_error(f"在 {source_dir} 中找不到源文件")
+    def execute_test_cases(self, executable: Path, lang: str, test_cases, memory_limit: int = 0,
+                           output_limit: int = 0, jobs: Optional[int] = None):
+        """按用例顺序产出 (测试用例, 评测结果)，jobs > 1 时在线程池中并发执行（默认使用 self.jobs）"""
+        jobs = self.jobs if jobs is None else jobs
+
+        def run(test_case):
+            with self.cpu_lease() as cpu:
+                return self.judge_case(executable, lang, test_case, memory_limit, output_limit, cpu)
+
+        if jobs <= 1:
+            for test_case in test_cases:
+                yield test_case, run(test_case)
+            return
+
+        # 只保留有限个在途任务，结果仍按用例顺序返回
+        window = jobs * 2
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for test_case in test_cases:
+                pending.append((test_case, executor.submit(run, test_case)))
+                if len(pending) >= window:
+                    test_case, future = pending.popleft()
+                    yield test_case, future.result()
+            while pending:
+                test_case, future = pending.popleft()
+                yield test_case, future.result()
+
+    def solution_fingerprint(self, problem: str, lang: str, executable: Path) -> Optional[str]:
+        """解决方案的指纹：源码内容、编译器路径/版本和编译参数（Python 为源码、解释器及其版本）"""
+        source_file = self.find_source_file(problem, lang)
+        if source_file is None:
             return None
-        
-        source_file = source_files[0]  # 使用第一个找到的源文件
-        
-        # 创建构建目录
-        build_problem_dir = self.build_dir / problem
-        build_problem_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 设置输出文件
-        if lang == "java":
-            output_file = build_problem_dir / f"{source_file.stem}.class"
-        elif lang == "python":
-            # Python不需要编译，直接返回源文件
-            self.print_success(f"Python脚本: {source_file}")
-            return source_file
-        else:
-            executable_name = f"{problem}_{lang}"
-            if platform.system() == "Windows" and not self.use_wsl:
-                executable_name += ".exe"
-            output_file = build_problem_dir / executable_name
-        
-        # 编译
-        compile_cmd = self.get_compiler_command(lang, source_file, output_file)
-        if not compile_cmd:  # Python等解释型语言
-            return source_file
-            
-        self.print_info(f"编译命令: {' '.join(compile_cmd)}")
-        
         try:
-            result = subprocess.run(
-                compile_cmd, 
-                capture_output=True, 
-                text=True, 
-                timeout=30,
-                cwd=str(build_problem_dir) if lang == "java" else None,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            if result.returncode != 0:
-                self.print_error("编译失败:")
-                if result.stderr:
-                    print(f"{Colors.RED}{result.stderr}{Colors.END}")
-                return None
-            
-            self.print_success(f"编译成功: {output_file}")
-            return output_file
-            
-        except subprocess.TimeoutExpired:
-            self.print_error("编译超时")
-            return None
-        except FileNotFoundError:
-            self.print_error(f"编译器未找到。请确保已安装 {lang} 编译器")
-            if not self.use_wsl and platform.system() == "Windows":
-                self.print_info("提示: 在Windows上可以尝试使用 --wsl 选项")
-                self.print_info("或者安装 MinGW-w64 或 Visual Studio Build Tools")
-                self.print_info("推荐下载: https://www.mingw-w64.org/downloads/")
-                self.print_info("或者使用打包版本（包含编译器）")
+            if lang == "python":
+                python = self.get_python_command()
+                # 同一命令名的解释器升级后版本不同，缓存的结果随之失效
+                version = self.compiler_detector.probe([python, "--version"]) or ""
+                return BuildCache.make_key(source_file.read_bytes(), python, version)
+        except OSError:
             return None
+        return self.compile_cache_key(source_file, executable, self.get_compiler_command(lang, source_file, executable))
 
-    def run_single_test(self, executable: Path, lang: str, test_input: str) -> Tuple[bool, str, str, float]:
-        """运行单个测试用例"""
-        run_cmd = self.get_run_command(lang, executable)
-        
-        start_time = time.time()
-        try:
-            process = subprocess.run(
-                run_cmd,
-                input=test_input,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout,
-                encoding='utf-8',
-                errors='replace'
-            )
-            end_time = time.time()
-            
-            if process.returncode != 0:
-                return False, "", f"运行时错误 (退出码: {process.returncode})\n{process.stderr}", end_time - start_time
-            
-            return True, process.stdout, process.stderr, end_time - start_time
-            
-        except subprocess.TimeoutExpired:
-            end_time = time.time()
-            return False, "", f"超时 (>{self.timeout}秒)", end_time - start_time
-
-    def compare_output(self, expected: str, actual: str) -> bool:
-        """比较输出结果"""
-        # 去除首尾空白并比较
-        expected_lines = [line.rstrip() for line in expected.strip().split('\n')]
-        actual_lines = [line.rstrip() for line in actual.strip().split('\n')]
-        return expected_lines == actual_lines
-
-    def run_tests(self, problem: str, lang: str) -> bool:
-        """运行所有测试用例"""
+    def execute_with_result_cache(self, executable: Path, lang: str, numbered_cases, memory_limit: int,
+                                  output_limit: int, result_cache: Optional[ResultCache], fingerprint: Optional[str]):
+        """按用例顺序产出 (编号, 测试用例, 评测结果)，结果缓存命中的用例不再运行（结果中 cached 为 True）"""
+        def plan():
+            for number, test_case in numbered_cases:
+                key = None
+                if result_cache is not None:
+                    key = result_cache.case_key(fingerprint, test_case, self.timeout, memory_limit, output_limit)
+                hit = result_cache.lookup(key) if key else None
+                yield number, test_case, key, hit
+
+        ahead, behind = itertools.tee(plan())
+        results = self.execute_test_cases(executable, lang,
+                                          (test_case for _, test_case, _, hit in ahead if hit is None),
+                                          memory_limit, output_limit)
+        try:
+            for number, test_case, key, hit in behind:
+                if hit is not None:
+                    yield number, test_case, hit
+                    continue
+                _, result = next(results)
+                if key and result['verdict'] == Verdict.AC:
+                    result_cache.store(key, result)
+                yield number, test_case, result
+        finally:
+            results.close()
+
+    def run_tests(self, problem: str, lang: str, case_numbers: Optional[List[int]] = None) -> bool:
+        """运行所有测试用例（case_numbers 指定时只运行这些编号的用例）"""
         self.print_header(f"测试问题: {problem} ({lang})")
         
         try:
             # 加载测试用例
             problem_dir = self.problems_dir / problem
-            test_cases = self.load_test_cases(problem_dir)
-            self.print_info(f"加载了 {len(test_cases)} 个测试用例")
+            test_cases = loaded_cases = self.load_test_cases(problem_dir)
+            result_cache = None
+            if self.use_result_cache or self.rerun_failed:
+                result_cache = ResultCache(self.build_dir / problem / f".results-{lang}.json")
+            if self.rerun_failed and not case_numbers and result_cache.loaded:
+                total = len(test_cases)
+                case_numbers = [n for n in result_cache.failed if n <= total]
+                if not case_numbers:
+                    self.print_success("上次运行没有失败的测试用例")
+                    return True
+                self.print_info(f"重新运行上次失败的测试用例: {case_numbers}")
+            full_run = not case_numbers
+            if case_numbers:
+                # 通过索引直接定位所选用例，不读取其他用例
+                total = len(test_cases)
+                invalid = [n for n in case_numbers if not 1 <= n <= total]
+                if invalid:
+                    self.print_error(f"测试用例编号超出范围 (共 {total} 个): {invalid}")
+                    return False
+                numbers = case_numbers
+                test_cases = [test_cases[n - 1] for n in case_numbers]
+                self.print_info(f"运行 {len(numbers)}/{total} 个测试用例")
+            else:
+                total = self.count_test_cases(test_cases)
+                numbers = itertools.count(1)
+                if total is None:
+                    self.print_info("测试文件较大，边读取边运行测试用例")
+                else:
+                    self.print_info(f"加载了 {total} 个测试用例")
             
             # 编译
             executable = self.compile_solution(problem, lang)
@@ -442,52 +3456,812 @@ class OJTester:
             
             # 运行测试
             passed = 0
-            total = len(test_cases)
+            if self.jobs > 1:
+                self.print_info(f"并发执行: {self.jobs} 个线程")
             
-            for i, test_case in enumerate(test_cases, 1):
-                print(f"\n{Colors.YELLOW}测试用例 {i}/{total}:{Colors.END}")
+            executed = 0
+            cached = 0
+            history_rows = []
+            config = self.load_problem_config(problem_dir)
+            memory_limit = int(config.get("memory_limit", self.memory_limit))
+            output_limit = int(config.get("output_limit", self.output_limit))
+            if memory_limit:
+                self.print_info(f"内存限制: {memory_limit}MB")
+            fingerprint = self.solution_fingerprint(problem, lang, executable) if self.use_result_cache else None
+            results = self.execute_with_result_cache(executable, lang, zip(numbers, test_cases), memory_limit,
+                                                     output_limit, result_cache if fingerprint else None, fingerprint)
+            for i, test_case, result in results:
+                executed += 1
+                print(f"\n{Colors.YELLOW}测试用例 {i}/{total if total is not None else '?'}:{Colors.END}")
                 
                 test_input = test_case.get("input", "")
                 expected_output = test_case.get("output", "")
+                input_file = test_case.get("input_file")
+                expected_file = test_case.get("output_file")
                 
                 # 显示输入（如果不太长）
-                if len(test_input) <= 100:
+                if input_file:
+                    size = input_file.stat().st_size if input_file.exists() else 0
+                    print(f"输入: 文件 {input_file} ({size} 字节)")
+                elif len(test_input) <= 100:
                     print(f"输入: {repr(test_input)}")
                 else:
                     print(f"输入: (长度 {len(test_input)} 字符)")
                 
-                success, actual_output, error_msg, exec_time = self.run_single_test(
-                    executable, lang, test_input
-                )
-                
-                if not success:
-                    self.print_error(f"运行失败: {error_msg}")
+                verdict = result['verdict']
+                if result_cache is not None:
+                    result_cache.record_outcome(i, verdict == Verdict.AC)
+                if result.get('cached'):
+                    cached += 1
+                    self.print_success(f"通过 (缓存结果, {self.format_usage(result)})")
+                    passed += 1
                     continue
-                
-                if self.compare_output(expected_output, actual_output):
-                    self.print_success(f"通过 (耗时: {exec_time:.3f}秒)")
+                history_rows.append((i, {key: result[key] for key in ('verdict', 'time', 'cpu_time', 'memory')}))
+                if verdict == Verdict.AC:
+                    self.print_success(f"通过 ({self.format_usage(result)})")
                     passed += 1
-                else:
-                    self.print_error("输出不匹配")
+                elif verdict == Verdict.WA:
+                    line_number, column, expected_line, actual_line = result['mismatch']
+                    self.print_error(f"输出不匹配 (第 {line_number} 行第 {column} 列)")
                     print(f"{Colors.PURPLE}期望输出:{Colors.END}")
-                    print(repr(expected_output))
+                    print(f"(见文件 {expected_file})" if expected_file else repr(expected_output))
                     print(f"{Colors.PURPLE}实际输出:{Colors.END}")
-                    print(repr(actual_output))
+                    actual_output = result['output']
+                    if len(actual_output) >= self.DISPLAY_LIMIT:
+                        print(repr(actual_output) + " ...(已截断)")
+                    else:
+                        print(repr(actual_output))
+                    print(f"{Colors.PURPLE}第 {line_number} 行:{Colors.END} "
+                          f"期望 {self.describe_line(expected_line, column)}，"
+                          f"实际 {self.describe_line(actual_line, column)}")
+                elif verdict in (Verdict.MLE, Verdict.OLE):
+                    self.print_error(f"{result['error']} ({self.format_usage(result)})")
+                else:
+                    self.print_error(f"运行失败: {result['error']}")
             
+            self.record_history(problem, lang, "test", history_rows)
+            if result_cache is not None:
+                try:
+                    result_cache.save(full_run)
+                except OSError as e:
+                    self.print_warning(f"写入结果缓存失败: {e}")
+            self.save_pending_test_pack(problem_dir, loaded_cases)
+
             # 总结
-            print(f"\n{Colors.BOLD}测试结果: {passed}/{total} 通过{Colors.END}")
+            cached_note = f" ({cached} 个来自缓存)" if cached else ""
+            print(f"\n{Colors.BOLD}测试结果: {passed}/{executed} 通过{cached_note}{Colors.END}")
             
-            if passed == total:
+            if passed == executed:
                 self.print_success("所有测试用例通过! 🎉")
                 return True
             else:
-                self.print_warning(f"{total - passed} 个测试用例失败")
+                self.print_warning(f"{executed - passed} 个测试用例失败")
                 return False
                 
         except Exception as e:
             self.print_error(f"测试过程中出错: {e}")
             return False
 
+    def bench_problem(self, problem: str, lang: str, case_numbers: Optional[List[int]] = None,
+                      warmup: int = 1, repeat: int = 5, jobs: int = 1) -> Optional[Dict]:
+        """基准测试：每个用例先预热 warmup 次，再重复运行 repeat 次统计耗时
+
+        默认逐个串行运行（忽略 --jobs），jobs > 1 时并发运行（用于与串行结果比较，见 compare_parallel）；
+        各轮按用例顺序交替进行，减小系统负载漂移对个别用例的影响。
+        返回 {'cases': {编号: {'time': 统计, 'cpu_time': 统计或None, 'memory': 峰值}}, 'total': 统计}，
+        其中 'total' 为每轮所有用例耗时之和的统计；编译失败或有用例未通过时返回 None。
+        """
+        label = lang
+        if lang in ["cpp", "c"] and self.build_profile != self.DEFAULT_BUILD_PROFILE:
+            label += f", {self.build_profile}"
+        self.print_header(f"基准测试: {problem} ({label})")
+        problem_dir = self.problems_dir / problem
+        try:
+            test_cases = self.load_test_cases(problem_dir)
+        except Exception as e:
+            self.print_error(f"加载测试用例失败: {e}")
+            return None
+        total = len(test_cases)
+        numbers = case_numbers or list(range(1, total + 1))
+        invalid = [n for n in numbers if not 1 <= n <= total]
+        if invalid:
+            self.print_error(f"测试用例编号超出范围 (共 {total} 个): {invalid}")
+            return None
+
+        executable = self.compile_solution(problem, lang)
+        if not executable:
+            return None
+        config = self.load_problem_config(problem_dir)
+        memory_limit = int(config.get("memory_limit", self.memory_limit))
+        output_limit = int(config.get("output_limit", self.output_limit))
+        self.print_info(f"{len(numbers)} 个用例，预热 {warmup} 次，重复 {repeat} 次"
+                        + (f"，并发 {jobs}" if jobs > 1 else "")
+                        + ("，绑定 CPU" if self.cpu_scheduler is not None else ""))
+
+        plan = [(round_index, n) for round_index in range(warmup + repeat) for n in numbers]
+        samples = {n: {'time': [], 'cpu_time': [], 'memory': []} for n in numbers}
+        round_totals = [0.0] * repeat
+        results = self.execute_test_cases(executable, lang, (test_cases[n - 1] for _, n in plan),
+                                          memory_limit, output_limit, jobs=jobs)
+        try:
+            for (round_index, n), (_, result) in zip(plan, results):
+                if result['verdict'] != Verdict.AC:
+                    self.print_error(f"测试用例 {n} 未通过 ({result['verdict']})，基准测试中止")
+                    return None
+                if round_index < warmup:
+                    continue
+                case_samples = samples[n]
+                case_samples['time'].append(result['time'])
+                if result['cpu_time'] is not None:
+                    case_samples['cpu_time'].append(result['cpu_time'])
+                if result['memory'] is not None:
+                    case_samples['memory'].append(result['memory'])
+                round_totals[round_index - warmup] += result['time']
+        finally:
+            results.close()
+
+        report = {'cases': {}, 'total': timing_stats(round_totals)}
+        for n in numbers:
+            case_samples = samples[n]
+            report['cases'][n] = {
+                'time': timing_stats(case_samples['time']),
+                'cpu_time': timing_stats(case_samples['cpu_time']) if case_samples['cpu_time'] else None,
+                'memory': max(case_samples['memory']) if case_samples['memory'] else None,
+            }
+        self.print_bench_report(report)
+        self.record_history(problem, lang, "bench", [
+            (n, {'verdict': Verdict.AC, 'time': case['time']['median'],
+                 'cpu_time': case['cpu_time']['median'] if case['cpu_time'] else None,
+                 'memory': case['memory']})
+            for n, case in report['cases'].items()])
+        return report
+
+    def print_bench_report(self, report: Dict):
+        """打印单个问题的基准测试结果（时间单位: 毫秒）"""
+        columns = ['最小', '中位数', 'P95', '标准差', 'CPU中位数']
+        print(f"\n  {pad_display('用例', 8)}" + "".join(pad_display(f"{c}(ms)", 14, '>') for c in columns)
+              + pad_display('内存(MB)', 12, '>'))
+
+        def row(label, stats, cpu_stats=None, memory=None):
+            cells = [stats['min'], stats['median'], stats['p95'], stats['stddev']]
+            text = "".join(f"{value * 1000:>14.3f}" for value in cells)
+            text += f"{cpu_stats['median'] * 1000:>14.3f}" if cpu_stats else f"{'-':>14}"
+            text += f"{memory / (1024 * 1024):>12.1f}" if memory is not None else f"{'-':>12}"
+            print(f"  {pad_display(label, 8)}{text}")
+
+        for n, case in report['cases'].items():
+            row(str(n), case['time'], case['cpu_time'], case['memory'])
+        row('合计', report['total'])
+
+    def print_bench_comparison(self, problem: str, reports: Dict[str, Dict]):
+        """并排比较多种语言的中位耗时（毫秒），并给出相对第一种语言的倍数"""
+        self.print_header(f"语言对比: {problem} (中位耗时 ms)")
+        langs = list(reports)
+        base = langs[0]
+        header = f"  {pad_display('用例', 8)}" + "".join(pad_display(lang, 14, '>') for lang in langs)
+        header += "".join(pad_display(f"{lang}/{base}", 14, '>') for lang in langs[1:])
+        print(header)
+        numbers = [n for n in reports[base]['cases'] if all(n in reports[lang]['cases'] for lang in langs)]
+        rows = [(str(n), {lang: reports[lang]['cases'][n]['time']['median'] for lang in langs}) for n in numbers]
+        rows.append(('合计', {lang: reports[lang]['total']['median'] for lang in langs}))
+        for label, medians in rows:
+            text = "".join(f"{medians[lang] * 1000:>14.3f}" for lang in langs)
+            for lang in langs[1:]:
+                ratio = medians[lang] / medians[base] if medians[base] > 0 else float('inf')
+                text += f"{'x' + format(ratio, '.2f'):>14}"
+            print(f"  {pad_display(label, 8)}{text}")
+
+    def run_benchmarks(self, problems: List[str], langs: List[str], case_numbers: Optional[List[int]] = None,
+                       warmup: int = 1, repeat: int = 5) -> Tuple[bool, Dict[str, Dict[str, Dict]]]:
+        """对每个问题、每种语言运行基准测试，多种语言时打印对比表
+
+        返回 (是否全部完成, {问题: {语言: 基准测试结果}})。
+        """
+        success = True
+        all_reports = {}
+        for problem in problems:
+            reports = {}
+            for lang in langs:
+                report = self.bench_problem(problem, lang, case_numbers, warmup, repeat)
+                if report is None:
+                    success = False
+                else:
+                    reports[lang] = report
+            if len(reports) > 1:
+                self.print_bench_comparison(problem, reports)
+            all_reports[problem] = reports
+        return success, all_reports
+
+    def compare_profiles(self, problem: str, lang: str, case_numbers: Optional[List[int]] = None,
+                         warmup: int = 1, repeat: int = 5, profiles: Tuple[str, ...] = ("O2", "O3", "lto", "pgo")) -> bool:
+        """依次用各编译配置编译并运行基准测试，报告相对 O2 的加速比（debug 配置用于查错，不参与比较）"""
+        if lang not in ["cpp", "c"]:
+            self.print_warning(f"编译配置只适用于 C/C++，跳过 {lang}")
+            return True
+        original_profile = self.build_profile
+        reports = {}
+        try:
+            for profile in profiles:
+                self.build_profile = profile
+                report = self.bench_problem(problem, lang, case_numbers, warmup, repeat)
+                if report is None:
+                    return False
+                reports[profile] = report
+        finally:
+            self.build_profile = original_profile
+        self.print_profile_comparison(problem, lang, reports)
+        return True
+
+    def compare_parallel(self, problem: str, lang: str, case_numbers: Optional[List[int]] = None,
+                         warmup: int = 1, repeat: int = 5) -> bool:
+        """分别串行和以 --jobs 并发运行基准测试，比较每个用例的中位耗时和标准差
+
+        并发的中位耗时与串行相差不超过 max(串行标准差的 2 倍, 串行中位耗时的 PARALLEL_TOLERANCE)，
+        且标准差也不超过这一范围时视为一致；全部一致时返回 True。
+        """
+        if self.jobs <= 1:
+            self.print_warning("--jobs 为 1，并发运行与串行相同；请用 --jobs 指定并发数")
+        serial = self.bench_problem(problem, lang, case_numbers, warmup, repeat, jobs=1)
+        if serial is None:
+            return False
+        parallel = self.bench_problem(problem, lang, case_numbers, warmup, repeat, jobs=self.jobs)
+        if parallel is None:
+            return False
+        return self.print_parallel_comparison(problem, lang, serial, parallel)
+
+    def print_parallel_comparison(self, problem: str, lang: str, serial: Dict, parallel: Dict) -> bool:
+        """打印串行与并发基准测试的逐用例对比（毫秒），返回是否全部一致"""
+        self.print_header(f"串行/并发对比: {problem} ({lang}, 并发 {self.jobs})")
+        columns = ['串行中位数', '并发中位数', '差异(%)', '串行标准差', '并发标准差']
+        print(f"  {pad_display('用例', 8)}" + "".join(pad_display(c, 14, '>') for c in columns)
+              + pad_display('结论', 8, '>'))
+        inconsistent = 0
+        for n, case in serial['cases'].items():
+            before, after = case['time'], parallel['cases'][n]['time']
+            delta = after['median'] - before['median']
+            change = delta / before['median'] * 100 if before['median'] > 0 else 0.0
+            tolerance = max(2 * before['stddev'], self.PARALLEL_TOLERANCE * before['median'])
+            if abs(delta) <= tolerance and after['stddev'] <= tolerance:
+                status = f"{Colors.GREEN}{pad_display('一致', 8, '>')}{Colors.END}"
+            else:
+                inconsistent += 1
+                status = f"{Colors.RED}{pad_display('不一致', 8, '>')}{Colors.END}"
+            text = (f"{before['median'] * 1000:>14.3f}{after['median'] * 1000:>14.3f}{change:>+14.1f}"
+                    f"{before['stddev'] * 1000:>14.3f}{after['stddev'] * 1000:>14.3f}")
+            print(f"  {pad_display(str(n), 8)}{text}{status}")
+        if inconsistent:
+            self.print_warning(f"{inconsistent} 个用例的并发测量与串行不一致"
+                               + ("" if self.cpu_scheduler is not None else "，可尝试 --pin-cpus"))
+            return False
+        self.print_success("并发测量与串行一致")
+        return True
+
+    def print_profile_comparison(self, problem: str, lang: str, reports: Dict[str, Dict]):
+        """打印各编译配置的合计耗时(ms)及相对 O2 的加速比（O2 耗时 / 该配置耗时）"""
+        self.print_header(f"编译配置对比: {problem} ({lang})")
+        print(f"  {pad_display('配置', 8)}" + pad_display('合计中位数(ms)', 16, '>') + pad_display('合计P95(ms)', 14, '>')
+              + pad_display('加速比', 10, '>'))
+        base = reports.get(self.DEFAULT_BUILD_PROFILE, next(iter(reports.values())))['total']['median']
+        for profile, report in reports.items():
+            total = report['total']
+            speedup = base / total['median'] if total['median'] > 0 else float('inf')
+            color = Colors.GREEN if speedup >= 1.02 else Colors.RED if speedup <= 0.98 else ''
+            text = f"{total['median'] * 1000:>16.3f}{total['p95'] * 1000:>14.3f}"
+            print(f"  {pad_display(profile, 8)}{text}{color}{'x' + format(speedup, '.2f'):>10}{Colors.END if color else ''}")
+
+    @staticmethod
+    def load_baseline(path: Path) -> Dict:
+        """读取基线文件，不存在时返回空基线"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': 1, 'problems': {}}
+
+    def save_baseline(self, path: Path, reports: Dict[str, Dict[str, Dict]]):
+        """把基准测试结果合并写入基线文件（只覆盖本次测试的问题和语言）"""
+        baseline = self.load_baseline(path)
+        for problem, lang_reports in reports.items():
+            for lang, report in lang_reports.items():
+                source_file = self.find_source_file(problem, lang)
+                baseline['problems'].setdefault(problem, {})[lang] = {
+                    'source_hash': hashlib.sha256(source_file.read_bytes()).hexdigest()[:12] if source_file else "",
+                    'recorded_at': time.time(),
+                    'cases': {str(n): {'median': case['time']['median'], 'p95': case['time']['p95'],
+                                       'memory': case['memory']}
+                              for n, case in report['cases'].items()},
+                    'total': {'median': report['total']['median'], 'p95': report['total']['p95']},
+                }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".baseline-", dir=str(path.parent))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, str(path))
+        self.print_success(f"已保存基线: {path}")
+
+    def compare_with_baseline(self, baseline: Dict, problem: str, lang: str, report: Dict,
+                              threshold: float, allow_missing: bool = False) -> bool:
+        """与基线比较中位耗时和峰值内存，任一用例超出 threshold（比例）时返回 False
+
+        耗时的增加量小于 BASELINE_NOISE_FLOOR 时不视为退化，避免毫秒级用例的抖动误报。
+        基线中没有该问题/语言的记录时返回 False（allow_missing 时只给出警告），以免检查被静默跳过。
+        """
+        self.print_header(f"基线对比: {problem} ({lang})")
+        entry = baseline.get('problems', {}).get(problem, {}).get(lang)
+        if entry is None:
+            if allow_missing:
+                self.print_warning("基线中没有该问题/语言的记录，跳过比较")
+                return True
+            self.print_error("基线中没有该问题/语言的记录 (可先用 --save-baseline 保存，"
+                             "或加上 --allow-missing-baseline 跳过)")
+            return False
+
+        print(f"  {pad_display('用例', 8)}{pad_display('基线(ms)', 12, '>')}{pad_display('本次(ms)', 12, '>')}"
+              f"{pad_display('变化', 10, '>')}{pad_display('基线内存', 12, '>')}{pad_display('本次内存', 12, '>')}  结果")
+        rows = [(str(n), case['time']['median'], case['memory']) for n, case in report['cases'].items()]
+        rows.append(('合计', report['total']['median'], None))
+        regressions = 0
+        for label, median, memory in rows:
+            base = entry['total'] if label == '合计' else entry['cases'].get(label)
+            if base is None:
+                print(f"  {pad_display(label, 8)}{'-':>12}{median * 1000:>12.3f}{'-':>10}{'-':>12}{'-':>12}  新用例")
+                continue
+            change = median / base['median'] - 1 if base['median'] > 0 else 0.0
+            slower = change > threshold and median - base['median'] > self.BASELINE_NOISE_FLOOR
+            base_memory = base.get('memory')
+            heavier = bool(memory and base_memory and memory > base_memory * (1 + threshold))
+            issues = [name for name, flag in (("耗时退化", slower), ("内存退化", heavier)) if flag]
+            if issues:
+                regressions += 1
+                status = f"{Colors.RED}{'，'.join(issues)}{Colors.END}"
+            else:
+                status = f"{Colors.GREEN}正常{Colors.END}"
+            memory_cells = "".join(f"{value / (1024 * 1024):>10.1f}MB" if value else f"{'-':>12}"
+                                   for value in (base_memory, memory))
+            print(f"  {pad_display(label, 8)}{base['median'] * 1000:>12.3f}{median * 1000:>12.3f}"
+                  f"{change * 100:>+9.1f}%{memory_cells}  {status}")
+
+        if regressions:
+            self.print_error(f"{regressions} 项超出基线 {threshold * 100:.0f}%")
+            return False
+        self.print_success(f"未超出基线 {threshold * 100:.0f}%")
+        return True
+
+    def record_history(self, problem: str, lang: str, mode: str, results: List[Tuple[int, Dict]]):
+        """把本次运行的用例结果写入历史记录（写入失败只提示，不影响评测结果）"""
+        if self.history is None or not results:
+            return
+        source_file = self.find_source_file(problem, lang)
+        try:
+            source_hash = hashlib.sha256(source_file.read_bytes()).hexdigest()[:12] if source_file else ""
+            self.history.record(problem, lang, source_hash, mode, results)
+        except (OSError, sqlite3.Error) as e:
+            self.print_warning(f"写入历史记录失败: {e}")
+
+    def print_history(self, problem: str, lang: str, case_number: Optional[int] = None, limit: int = 20):
+        """显示某个问题（或其中一个用例）最近的耗时变化"""
+        if self.history is None:
+            self.print_error("历史记录不可用（缺少 sqlite3 模块或已禁用）")
+            return
+        title = f"历史记录: {problem} ({lang})" + (f" 用例 {case_number}" if case_number else "")
+        self.print_header(title)
+        if case_number:
+            rows = self.history.case_trend(problem, lang, case_number, limit)
+        else:
+            rows = self.history.run_trend(problem, lang, limit)
+        if not rows:
+            self.print_warning("没有找到历史记录")
+            return
+
+        columns = [('时间', 21, '<'), ('模式', 7, '<'), ('源码', 14, '<'), ('结果', 8, '<'),
+                   ('耗时(ms)', 12, '>'), ('CPU(ms)', 12, '>'), ('内存(MB)', 10, '>')]
+        print("  " + "".join(pad_display(name, width, align) for name, width, align in columns))
+        first_time = None
+        for row in rows:
+            if case_number:
+                verdict = row['verdict']
+            else:
+                verdict = f"{row['passed']}/{row['cases']}"
+            wall_time = row['wall_time']
+            if first_time is None and wall_time:
+                first_time = wall_time
+            cpu_time = f"{row['cpu_time'] * 1000:.3f}" if row['cpu_time'] is not None else "-"
+            memory = f"{row['memory'] / (1024 * 1024):.1f}" if row['memory'] is not None else "-"
+            recorded_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row['recorded_at']))
+            change = f" (x{wall_time / first_time:.2f})" if first_time and wall_time else ""
+            print(f"  {pad_display(recorded_at, 21)}{pad_display(row['mode'], 7)}"
+                  f"{pad_display(row['source_hash'] or '-', 14)}{pad_display(verdict, 8)}"
+                  f"{wall_time * 1000:>12.3f}{cpu_time:>12}{memory:>10}{change}")
+
+    def print_slowest(self, problem: Optional[str], langs: List[str], limit: int = 10):
+        """按最近一次耗时列出最慢的用例，并与该用例最早一次通过时的耗时比较"""
+        if self.history is None:
+            self.print_error("历史记录不可用（缺少 sqlite3 模块或已禁用）")
+            return
+        self.print_header(f"最慢的用例 ({problem or '所有问题'}, {','.join(langs)})")
+        rows = self.history.slowest(problem, langs, limit)
+        if not rows:
+            self.print_warning("没有找到历史记录")
+            return
+        print(f"  {pad_display('问题', 20)}{pad_display('语言', 8)}{pad_display('用例', 6)}{pad_display('结果', 6)}"
+              f"{pad_display('耗时(ms)', 12, '>')}{pad_display('首次(ms)', 12, '>')}{pad_display('变化', 10, '>')}"
+              f"{pad_display('内存(MB)', 10, '>')}")
+        for row in rows:
+            first_time = row['first_wall_time']
+            first = f"{first_time * 1000:.3f}" if first_time is not None else "-"
+            change = f"x{row['wall_time'] / first_time:.2f}" if first_time else "-"
+            memory = f"{row['memory'] / (1024 * 1024):.1f}" if row['memory'] is not None else "-"
+            print(f"  {pad_display(row['problem'], 20)}{pad_display(row['lang'], 8)}"
+                  f"{pad_display(str(row['case_number']), 6)}{pad_display(row['verdict'], 6)}"
+                  f"{row['wall_time'] * 1000:>12.3f}{first:>12}{change:>10}{memory:>10}")
+
+    def complexity_analysis(self, problem: str, lang: str, min_size: int = 1000, max_size: int = 10 ** 8,
+                            growth: float = 2.0, seed: int = 1, repeat: int = 3) -> bool:
+        """经验复杂度分析：用 gen 按几何增长的规模生成输入并测量 CPU 时间，拟合复杂度模型
+
+        gen 以 `gen <种子> <规模>` 方式调用。每个规模运行 repeat 次取最小 CPU 时间，
+        CPU 时间超过超时时间的一半、规模超过 max_size 或程序运行失败时停止增长。
+        """
+        self.print_header(f"复杂度分析: {problem} ({lang})")
+        gen_lang = self.detect_language(problem, "gen")
+        if gen_lang is None:
+            self.print_error(f"在 {self.problems_dir / problem / 'gen'} 中找不到源文件")
+            return False
+        gen_executable = self.compile_solution(problem, gen_lang, "gen")
+        executable = self.compile_solution(problem, lang) if gen_executable else None
+        if not executable:
+            return False
+
+        work_dir = self.build_dir / problem / "complexity"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        input_file = work_dir / "input.txt"
+        budget = self.timeout / 2
+        self.print_info(f"规模从 {min_size} 开始每次扩大 {growth:g} 倍，直到 CPU 时间超过 {budget:g} 秒"
+                        f"或规模超过 {max_size}，每个规模运行 {repeat} 次")
+        if "python" in (lang, gen_lang):
+            self.get_fork_server()
+        print(f"\n  {pad_display('规模', 14)}{pad_display('输入(KB)', 12, '>')}"
+              f"{pad_display('CPU(ms)', 14, '>')}{pad_display('耗时(ms)', 14, '>')}")
+
+        sizes, cpu_times = [], []
+        size = max(min_size, 2)
+        try:
+            while size <= max_size:
+                # 大规模的输入直接写入文件，不经过内存
+                generated = self.run_program(gen_lang, gen_executable, [str(seed), str(size)],
+                                             output_file=input_file)
+                failure = self.describe_program_failure("gen", generated)
+                if failure:
+                    self.print_error(f"{failure} (规模 {size})")
+                    break
+
+                samples = []
+                for _ in range(repeat):
+                    result = self.run_program(lang, executable, [], input_file=input_file,
+                                              output_file=Path(os.devnull))
+                    failure = self.describe_program_failure(lang, result)
+                    if failure:
+                        self.print_warning(f"规模 {size}: {failure}")
+                        break
+                    samples.append(result)
+                if len(samples) < repeat:
+                    break
+
+                cpu_time = min(r['cpu_time'] if r['cpu_time'] is not None else r['time'] for r in samples)
+                wall_time = min(r['time'] for r in samples)
+                sizes.append(size)
+                cpu_times.append(cpu_time)
+                print(f"  {pad_display(str(size), 14)}{input_file.stat().st_size / 1024:>12.1f}"
+                      f"{cpu_time * 1000:>14.3f}{wall_time * 1000:>14.3f}")
+                if cpu_time >= budget:
+                    break
+                size = max(int(size * growth), size + 1)
+        finally:
+            try:
+                input_file.unlink()
+            except OSError:
+                pass
+
+        if len(sizes) < 3:
+            self.print_error("有效数据点不足 3 个，请调整 --min-n/--max-n 或检查 gen")
+            return False
+
+        fits = fit_complexity(sizes, cpu_times)
+        print(f"\n  {pad_display('模型', 14)}{pad_display('相对误差', 12, '>')}{pad_display('超时前最大规模', 20, '>')}")
+        for name, error, a, b in fits:
+            predicted = predict_max_size(name, a, b, self.timeout)
+            print(f"  {pad_display(name, 14)}{error * 100:>11.1f}%{str(predicted or '∞'):>20}")
+
+        best_name, _, a, b = fits[0]
+        # 用最大的几个规模估计 log-log 斜率，减小固定开销的影响
+        tail = [(n, t) for n, t in zip(sizes, cpu_times) if t > 0][-3:]
+        if len(tail) >= 2 and tail[-1][0] > tail[0][0]:
+            exponent = math.log(tail[-1][1] / tail[0][1]) / math.log(tail[-1][0] / tail[0][0])
+            self.print_success(f"最接近的复杂度: {best_name} (经验指数: n^{exponent:.2f})")
+        else:
+            self.print_success(f"最接近的复杂度: {best_name}")
+        predicted = predict_max_size(best_name, a, b, self.timeout)
+        if predicted is None:
+            self.print_info("运行时间几乎不随规模增长")
+        else:
+            self.print_info(f"按该模型，{self.timeout} 秒内可处理的最大规模约为 {predicted}")
+        return True
+
+    def describe_program_failure(self, name: str, result: Dict) -> Optional[str]:
+        """辅助程序运行失败时返回错误描述，成功时返回 None"""
+        if result['error']:
+            return f"{name} 运行失败: {result['error']}"
+        if result['timed_out']:
+            return f"{name} 运行失败: 超时 (>{self.timeout}秒)"
+        if result['output_exceeded']:
+            return f"{name} 运行失败: 输出超限 (限制: {self.output_limit}MB)"
+        if result['returncode'] != 0:
+            return f"{name} 运行失败: 退出码 {result['returncode']}\n{result['stderr']}"
+        return None
+
+    def judge_collected_output(self, run: Dict, expected: str, memory_limit: int, output_limit: int) -> Dict:
+        """按 judge_case 的规则评测 run_program 收集到的完整输出，返回格式相同的结果字典"""
+        result = {'verdict': Verdict.AC, 'time': run['time'], 'cpu_time': run['cpu_time'], 'memory': run['memory'],
+                  'output': run['stdout'][:self.DISPLAY_LIMIT], 'error': '', 'mismatch': None}
+        out_of_memory = memory_limit and (
+            (run['memory'] or 0) > memory_limit * 1024 * 1024
+            or (run['returncode'] != 0 and any(marker in run['stderr'] for marker in self.OUT_OF_MEMORY_MARKERS)))
+        if run['error']:
+            result.update(verdict=Verdict.RE, error=run['error'])
+        elif run['timed_out']:
+            result.update(verdict=Verdict.TLE, error=f"超时 (>{self.timeout}秒)")
+        elif run['output_exceeded']:
+            result.update(verdict=Verdict.OLE, error=f"输出超限 (限制: {output_limit}MB)")
+        elif out_of_memory:
+            result.update(verdict=Verdict.MLE, error=f"内存超限 (限制: {memory_limit}MB)")
+        elif run['returncode'] != 0:
+            result.update(verdict=Verdict.RE, error=f"运行时错误 (退出码: {run['returncode']})\n{run['stderr']}")
+        else:
+            mismatch = find_mismatch([expected.split('\n')], [run['stdout'].split('\n')])
+            if mismatch is not None:
+                result.update(verdict=Verdict.WA, mismatch=mismatch)
+        return result
+
+    def stress_test(self, problem: str, lang: str, count: int, seed: Optional[int] = None) -> bool:
+        """对拍：用 gen 生成随机输入，比较解决方案与 brute 的输出
+
+        gen 以 `gen <种子>` 方式调用并把输入写到标准输出；brute 的输出作为期望输出。
+        整个对拍共用一个 asyncio 运行器：每组数据先运行 gen，再同时运行解决方案和 brute 并比较，
+        多组数据在运行器的并发限制内流水线执行。发现不一致时停止，
+        并把已发现的反例中输入最短的一个追加到测试文件。
+        """
+        self.print_header(f"对拍: {problem} ({lang})")
+        problem_dir = self.problems_dir / problem
+        programs = {}
+        for role in ('gen', 'brute'):
+            role_lang = self.detect_language(problem, role)
+            if role_lang is None:
+                self.print_error(f"在 {problem_dir / role} 中找不到源文件")
+                return False
+            executable = self.compile_solution(problem, role_lang, role)
+            if not executable:
+                return False
+            programs[role] = (role_lang, executable)
+        executable = self.compile_solution(problem, lang)
+        if not executable:
+            return False
+        config = self.load_problem_config(problem_dir)
+        memory_limit = int(config.get("memory_limit", self.memory_limit))
+        output_limit = int(config.get("output_limit", self.output_limit))
+
+        workers = self.jobs if self.jobs > 1 else (os.cpu_count() or 1)
+        base_seed = seed if seed is not None else int.from_bytes(os.urandom(4), 'little')
+        self.print_info(f"运行 {count} 组随机数据 (起始种子: {base_seed}, 最多同时运行 {workers} 个进程)")
+        if lang == "python":
+            self.get_fork_server()
+
+        runner = AsyncProcessRunner(workers)
+
+        async def run_seed(case_seed: int) -> Optional[Dict]:
+            """生成并比较一组数据，一致时返回 None，否则返回描述反例或错误的字典"""
+            generated = await self.run_program_async(runner, *programs['gen'], [str(case_seed)])
+            failure = self.describe_program_failure("gen", generated)
+            if failure:
+                return {'seed': case_seed, 'error': f"{failure} (种子 {case_seed})"}
+            test_input = generated['stdout']
+            reference, outcome = await asyncio.gather(
+                self.run_program_async(runner, *programs['brute'], [], test_input),
+                self.run_program_async(runner, lang, executable, [], test_input, None, memory_limit,
+                                       output_limit=output_limit, exact_memory=bool(memory_limit)))
+            failure = self.describe_program_failure("brute", reference)
+            if failure:
+                return {'seed': case_seed, 'error': f"{failure} (种子 {case_seed})"}
+            expected = reference['stdout']
+            result = self.judge_collected_output(outcome, expected, memory_limit, output_limit)
+            if result['verdict'] == Verdict.AC:
+                return None
+            return {'seed': case_seed, 'input': test_input, 'output': expected, 'result': result}
+
+        failures = []
+        errors = []
+        done = 0
+        start_time = time.perf_counter()
+
+        async def run_seeds():
+            nonlocal done
+            last_report = start_time
+            seeds = iter(range(base_seed, base_seed + count))
+            # 在途的数据组数略多于并发数，使生成、运行和比较互相重叠
+            pending = {asyncio.ensure_future(run_seed(case_seed))
+                       for case_seed in itertools.islice(seeds, workers * 4)}
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    done += 1
+                    outcome = task.result()
+                    if outcome is not None:
+                        (errors if 'error' in outcome else failures).append(outcome)
+                # 发现问题后不再提交新的数据，只等待已提交的完成（可能找到更短的反例）
+                if not failures and not errors:
+                    for case_seed in itertools.islice(seeds, len(finished)):
+                        pending.add(asyncio.ensure_future(run_seed(case_seed)))
+                now = time.perf_counter()
+                if now - last_report >= 1:
+                    last_report = now
+                    print(f"\r已运行 {done}/{count} 组 ({done / (now - start_time):.0f} 组/秒)", end='', flush=True)
+
+        runner.run_all([run_seeds()])
+        elapsed = time.perf_counter() - start_time
+        print(f"\r已运行 {done}/{count} 组 ({done / max(elapsed, 1e-9):.0f} 组/秒)   ")
+
+        if errors:
+            self.print_error(min(errors, key=lambda outcome: outcome['seed'])['error'])
+            return False
+        if not failures:
+            self.print_success(f"{done} 组随机数据的输出全部一致 🎉")
+            return True
+
+        failure = min(failures, key=lambda outcome: (len(outcome['input']), outcome['seed']))
+        result = failure['result']
+        self.print_error(f"发现 {len(failures)} 组不一致的数据，最短的反例来自种子 {failure['seed']}")
+        print(f"{Colors.PURPLE}输入:{Colors.END}")
+        print(failure['input'] if len(failure['input']) <= 1000 else repr(failure['input'][:1000]) + " ...(已截断)")
+        if result['verdict'] == Verdict.WA:
+            line_number, column, expected_line, actual_line = result['mismatch']
+            print(f"{Colors.PURPLE}第 {line_number} 行第 {column} 列:{Colors.END} "
+                  f"brute {self.describe_line(expected_line, column)}，"
+                  f"{lang} {self.describe_line(actual_line, column)}")
+        else:
+            print(f"{Colors.PURPLE}结果:{Colors.END} {result['verdict']} {result['error']}")
+        try:
+            number, tests_file = self.append_test_case(problem_dir, failure['input'], failure['output'])
+            self.print_warning(f"已把反例保存为 {tests_file} 中的测试用例 {number}")
+        except (OSError, ValueError) as e:
+            self.print_error(f"保存反例失败: {e}")
+        return False
+
+    def append_test_case(self, problem_dir: Path, test_input: str, expected_output: str) -> Tuple[int, Path]:
+        """把测试用例追加到问题的测试文件（只有 tests.json 时追加到 JSON），返回 (用例编号, 文件路径)
+
+        输入或输出超过 DISPLAY_LIMIT 时写到 data/ 目录下的数据文件，测试文件中只引用文件路径。
+        """
+        tests_txt_file = problem_dir / "tests.txt"
+        tests_json_file = problem_dir / "tests.json"
+        use_json = tests_json_file.exists() and not tests_txt_file.exists()
+        number = len(self.load_test_cases(problem_dir)) + 1 if use_json or tests_txt_file.exists() else 1
+
+        entry = {}
+        for key, text, suffix in (("input", test_input, "in"), ("output", expected_output, "out")):
+            if len(text) > self.DISPLAY_LIMIT:
+                data_file = Path("data") / f"stress_{number}.{suffix}"
+                (problem_dir / data_file).parent.mkdir(parents=True, exist_ok=True)
+                (problem_dir / data_file).write_text(text, encoding='utf-8')
+                entry[f"{key}_file"] = data_file.as_posix()
+            else:
+                entry[key] = text.strip()
+
+        if use_json:
+            with open(tests_json_file, 'r', encoding='utf-8') as f:
+                tests = json.load(f)
+            if isinstance(tests, dict):
+                tests = [tests]
+            tests.append(entry)
+            with open(tests_json_file, 'w', encoding='utf-8') as f:
+                json.dump(tests, f, ensure_ascii=False, indent=2)
+            return number, tests_json_file
+
+        input_section = f"INPUT FILE: {entry['input_file']}" if 'input_file' in entry else f"INPUT:\n{entry['input']}"
+        output_section = (f"OUTPUT FILE: {entry['output_file']}" if 'output_file' in entry
+                          else f"OUTPUT:\n{entry['output']}")
+        prefix = ""
+        if tests_txt_file.exists() and tests_txt_file.stat().st_size > 0:
+            with open(tests_txt_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                prefix = "\n" if f.read(1) == b"\n" else "\n\n"
+        with open(tests_txt_file, 'a', encoding='utf-8') as f:
+            f.write(f"{prefix}=== TEST CASE {number} ===\n{input_section}\n{output_section}\n")
+        return number, tests_txt_file
+
+    def snapshot_problem(self, problem: str) -> Dict[Path, Tuple[int, int]]:
+        """记录问题目录下所有文件的 (修改时间, 大小)，键为相对问题目录的路径"""
+        problem_dir = self.problems_dir / problem
+        snapshot = {}
+        for root, dirs, files in os.walk(str(problem_dir)):
+            # 忽略隐藏目录和 Python 字节码缓存
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
+            for name in files:
+                if name.startswith('.') or name.endswith(('~', '.swp', '.pyc')):
+                    continue
+                path = Path(root) / name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                snapshot[path.relative_to(problem_dir)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def affected_languages(self, problem: str, changed: set, langs: List[str]) -> List[str]:
+        """根据变化的文件判断需要重新运行的语言
+
+        某语言目录下的变化只影响该语言；对拍的 gen/brute 不参与测试，不影响任何语言；
+        问题目录下其他源文件按扩展名对应到语言；测试文件、problem.json 和数据文件等影响所有语言。
+        """
+        suffixes = {pattern[1:]: lang for lang, pattern in self.SOURCE_PATTERNS.items()}
+        affected = set()
+        for path in changed:
+            top = path.parts[0] if len(path.parts) > 1 else None
+            if top in self.SOURCE_PATTERNS:
+                affected.add(top)
+            elif top in ('gen', 'brute'):
+                continue
+            elif path.suffix in suffixes:
+                affected.add(suffixes[path.suffix])
+            else:
+                affected.update(langs)
+        return [lang for lang in langs if lang in affected and (self.problems_dir / problem / lang).is_dir()]
+
+    def watch(self, problems: Optional[List[str]], langs: List[str], interval: float = 0.5):
+        """监视模式：源码或测试文件变化时，只重新编译并运行受影响的问题（Ctrl+C 退出）
+
+        problems 为 None 时监视所有问题（包括新建的问题）。编译器探测结果、已解析的测试用例、
+        编译产物和 Python 预热执行器在两次运行之间保持可用。
+        """
+        def current_problems():
+            return problems if problems is not None else self.list_problems()
+
+        snapshots = {problem: self.snapshot_problem(problem) for problem in current_problems()}
+        self.print_header("监视模式")
+        self.print_info(f"监视 {len(snapshots)} 个问题 ({','.join(langs)})，按 Ctrl+C 退出")
+        if problems is not None:
+            for problem in problems:
+                for lang in self.affected_languages(problem, {Path("tests.txt")}, langs):
+                    self.run_tests(problem, lang)
+
+        try:
+            while True:
+                time.sleep(interval)
+                changes = {}
+                for problem in current_problems():
+                    snapshot = self.snapshot_problem(problem)
+                    previous = snapshots.get(problem, {})
+                    changed = {path for path in snapshot.keys() | previous.keys()
+                               if snapshot.get(path) != previous.get(path)}
+                    if changed:
+                        changes[problem] = changed
+                if not changes:
+                    continue
+
+                # 编辑器保存时可能分几次写入，等文件稳定后再运行
+                time.sleep(interval / 2)
+                for problem, changed in changes.items():
+                    snapshots[problem] = self.snapshot_problem(problem)
+                    affected = self.affected_languages(problem, changed, langs)
+                    if not affected:
+                        continue
+                    names = ", ".join(sorted(str(path) for path in changed)[:5])
+                    self.print_info(f"检测到变化: {problem} ({names})")
+                    for lang in affected:
+                        self.run_tests(problem, lang)
+                self.print_info("继续监视...")
+        except KeyboardInterrupt:
+            print()
+            self.print_info("已退出监视模式")
+
     def clean_build(self, problem: str):
         """清理构建产物"""
         build_problem_dir = self.build_dir / problem
@@ -510,26 +4284,63 @@ class OJTester:
         
         return sorted(problems)
 
-    def run_all_problems(self, lang: str):
+    def run_all_problems(self, lang: str) -> bool:
         """运行所有问题"""
         problems = self.list_problems()
         if not problems:
             self.print_warning("没有找到任何问题")
-            return
+            return False
         
         self.print_header(f"运行所有问题 ({len(problems)} 个)")
         
-        success_count = 0
-        for problem in problems:
-            if self.run_tests(problem, lang):
-                success_count += 1
+        summary = {}
+        run_start = time.perf_counter()
+        if self.problem_jobs <= 1:
+            for problem in problems:
+                start_time = time.perf_counter()
+                success = self.run_tests(problem, lang)
+                summary[problem] = (success, time.perf_counter() - start_time)
+        else:
+            self.print_info(f"并发评测: {self.problem_jobs} 个进程")
+            # 评测进程共用同一个 cgroup 隔离环境，需在创建进程池之前准备好
+            self.get_cgroup_sandbox()
+            # 每个问题在独立进程中评测，输出整体捕获后再按问题成组打印
+            colors_enabled = bool(Colors.END)
+            with ProcessPoolExecutor(max_workers=min(self.problem_jobs, len(problems))) as executor:
+                futures = [executor.submit(_judge_problem_worker, self, problem, lang, colors_enabled)
+                           for problem in problems]
+                for future in as_completed(futures):
+                    problem, success, output, wall_time = future.result()
+                    sys.stdout.write(output)
+                    sys.stdout.flush()
+                    summary[problem] = (success, wall_time)
+        
+        self.print_summary(summary, time.perf_counter() - run_start)
+        success_count = sum(1 for success, _ in summary.values() if success)
         
         print(f"\n{Colors.BOLD}总体结果: {success_count}/{len(problems)} 个问题全部通过{Colors.END}")
         
         if success_count == len(problems):
             self.print_success("恭喜! 所有问题都通过了! 🎉🎉🎉")
+            return True
         else:
             self.print_warning(f"还有 {len(problems) - success_count} 个问题需要解决")
+            return False
+
+    def print_summary(self, summary: Dict[str, Tuple[bool, float]], elapsed: float):
+        """打印所有问题的汇总表（结果与墙钟耗时）"""
+        self.print_header("汇总")
+        print(f"  {pad_display('问题', 20)}{pad_display('结果', 8)}{pad_display('耗时(秒)', 12, '>')}")
+        for problem in sorted(summary):
+            success, wall_time = summary[problem]
+            if success:
+                status = f"{Colors.GREEN}{pad_display('通过', 8)}{Colors.END}"
+            else:
+                status = f"{Colors.RED}{pad_display('失败', 8)}{Colors.END}"
+            print(f"  {pad_display(problem, 20)}{status}{wall_time:>12.3f}")
+        total_time = sum(wall_time for _, wall_time in summary.values())
+        print(f"  {pad_display('累计', 28)}{total_time:>12.3f}")
+        print(f"  {pad_display('实际耗时', 28)}{elapsed:>12.3f}")
 
     def create_new_problem(self, problem_name: str):
         """创建新问题"""
@@ -623,21 +4434,263 @@ OUTPUT:
         except Exception as e:
             self.print_error(f"创建问题失败: {e}")
 
-def main():
+def parse_case_numbers(spec: str) -> List[int]:
+    """解析用例编号列表，如 1,3,5-7"""
+    numbers = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            numbers.extend(range(int(first), int(last) + 1))
+        else:
+            numbers.append(int(part))
+    return numbers
+
+def _judge_problem_worker(tester: OJTester, problem: str, lang: str, colors_enabled: bool):
+    """在子进程中评测单个问题，返回捕获的输出以便按问题成组打印"""
+    if not colors_enabled:
+        Colors.disable()
+    buffer = io.StringIO()
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            success = tester.run_tests(problem, lang)
+        except Exception as e:
+            tester.print_error(f"评测进程出错: {e}")
+            success = False
+    return problem, success, buffer.getvalue(), time.perf_counter() - start_time
+
+class OJDaemon:
+    """常驻评测服务
+
+    在 Unix 域套接字上接受客户端转发的命令行参数，用常驻的 OJTester 执行（同一工作目录和选项复用
+    同一个实例），编译器探测结果、已加载的测试包、Python 预热执行器等都保持在内存中。
+    请求依次处理；标准输出/错误按帧流式发回客户端（见 forward_to_daemon），最后发送退出码。
+    执行请求时切换的工作目录、环境变量和标准输出/错误都是进程全局的，因此 serve 必须一次只处理
+    一个连接，execute 会检查这一点。
+    """
+
+    class FrameWriter(io.TextIOBase):
+        """把写入的文本作为数据帧发送给客户端"""
+
+        def __init__(self, connection: socket.socket, kind: int):
+            self.connection = connection
+            self.kind = kind
+            # 客户端断开后不再发送，让命令尽快结束
+            self.broken = False
+
+        def writable(self) -> bool:
+            return True
+
+        def write(self, text: str) -> int:
+            data = text.encode('utf-8', errors='replace')
+            if data:
+                try:
+                    self.connection.sendall(DAEMON_FRAME.pack(self.kind, len(data)) + data)
+                except OSError:
+                    self.broken = True
+                    raise
+            return len(text)
+
+    def __init__(self):
+        self.socket_path = Path(DAEMON_SOCKET)
+        # (工作目录, 构造参数) → OJTester
+        self.testers = {}
+        self.version = script_version()
+        self.running = True
+        # 正在执行请求时持有，用于检查请求确实是依次执行的
+        self.busy = threading.Lock()
+
+    @staticmethod
+    def stop() -> bool:
+        """请求评测服务退出，返回服务是否在运行"""
+        connection = connect_daemon()
+        if connection is None:
+            return False
+        with connection:
+            connection.sendall(json.dumps({"stop": True}).encode('utf-8') + b"\n")
+            connection.recv(DAEMON_FRAME.size)
+        return True
+
+    def serve(self) -> bool:
+        """在前台运行评测服务，直到收到停止请求或 Ctrl+C"""
+        if not hasattr(socket, 'AF_UNIX'):
+            print(f"{Colors.RED}✗ 当前平台不支持 Unix 域套接字，无法启动评测服务{Colors.END}")
+            return False
+        existing = connect_daemon()
+        if existing is not None:
+            existing.close()
+            print(f"{Colors.YELLOW}⚠ 评测服务已在运行: {self.socket_path}{Colors.END}")
+            return False
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self.socket_path.unlink()  # 上次异常退出遗留的套接字
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(str(self.socket_path))
+            os.chmod(str(self.socket_path), 0o600)
+            server.listen(16)
+            print(f"{Colors.BLUE}ℹ 评测服务已启动: {self.socket_path} (Ctrl+C 或 --stop-daemon 退出){Colors.END}")
+            while self.running:
+                connection, _ = server.accept()
+                with connection:
+                    self.handle(connection)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            with contextlib.suppress(FileNotFoundError):
+                self.socket_path.unlink()
+        print(f"{Colors.BLUE}ℹ 评测服务已退出{Colors.END}")
+        return True
+
+    def handle(self, connection: socket.socket):
+        """处理一个客户端请求"""
+        try:
+            request = json.loads(connection.makefile('rb').readline() or b'{}')
+            if request.get("stop"):
+                self.running = False
+                connection.sendall(DAEMON_FRAME.pack(DAEMON_EXIT, 0))
+                return
+            if request.get("version") != self.version:
+                connection.sendall(DAEMON_FRAME.pack(DAEMON_REJECT, 0))
+                return
+            code = self.execute(connection, request["argv"], request["cwd"], request.get("env"))
+            connection.sendall(DAEMON_FRAME.pack(DAEMON_EXIT, code))
+        except (OSError, ValueError, KeyError):
+            pass  # 客户端已断开或请求格式错误
+
+    def execute(self, connection: socket.socket, argv: List[str], cwd: str,
+                env: Optional[Dict[str, str]] = None) -> int:
+        """在客户端的工作目录中、使用客户端的环境变量执行命令，输出转发给客户端，返回退出码
+
+        chdir 和 os.environ 对整个进程生效，不能与另一个请求同时执行。
+        """
+        if not self.busy.acquire(blocking=False):
+            raise RuntimeError("评测服务的请求必须依次执行")
+        stdout = self.FrameWriter(connection, DAEMON_STDOUT)
+        stderr = self.FrameWriter(connection, DAEMON_STDERR)
+        saved_cwd = os.getcwd()
+        saved_env = dict(os.environ)
+        try:
+            os.chdir(cwd)
+            if env is not None:
+                os.environ.clear()
+                os.environ.update(env)
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    main(argv, self.testers)
+                    return 0
+                except SystemExit as e:
+                    if e.code is None or isinstance(e.code, int):
+                        return e.code or 0
+                    print(e.code, file=sys.stderr)
+                    return 1
+                except Exception:
+                    if stdout.broken or stderr.broken:
+                        raise
+                    traceback.print_exc()
+                    return 1
+        finally:
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+            self.busy.release()
+
+def main(argv: Optional[List[str]] = None, testers: Optional[Dict] = None):
+    """命令行入口；testers 不为 None 时由评测服务调用，按工作目录和选项复用 OJTester"""
     parser = argparse.ArgumentParser(description="简易OJ测试小工具")
     parser.add_argument("--problem", "-p", help="要测试的问题名称")
-    parser.add_argument("--lang", "-l", default="cpp", help="编程语言 (默认: cpp)")
+    parser.add_argument("--lang", "-l", default="cpp", help="编程语言，多种语言用逗号分隔，如: cpp,python (默认: cpp)")
+    parser.add_argument("--case", help="只运行指定编号的测试用例，如: 3 或 1,4-6")
     parser.add_argument("--all", "-a", action="store_true", help="运行所有问题")
     parser.add_argument("--clean", "-c", action="store_true", help="清理构建产物")
     parser.add_argument("--wsl", action="store_true", help="在Windows上使用WSL运行")
     parser.add_argument("--timeout", "-t", type=int, default=5, help="执行超时时间(秒) (默认: 5)")
+    parser.add_argument("--memory-limit", "-m", type=int, default=0, help="内存限制(MB)，0 表示不限制；problem.json 中的设置优先 (默认: 0)")
+    parser.add_argument("--output-limit", type=int, default=64, help="输出限制(MB)，0 表示不限制；problem.json 中的设置优先 (默认: 64)")
+    parser.add_argument("--no-fork-server", action="store_true", help="Python 每个用例单独启动解释器，不使用预热执行器")
+    parser.add_argument("--profile", choices=list(OJTester.BUILD_PROFILES), default=OJTester.DEFAULT_BUILD_PROFILE,
+                        help="C/C++ 编译配置: debug(-O0 -g 及 AddressSanitizer/UBSan), O2, O3(-march=native), lto, "
+                             "pgo(用测试用例训练的 profile 引导优化) (默认: O2)")
+    parser.add_argument("--compare-profiles", action="store_true", help="对 C/C++ 解法分别用 O2/O3/lto/pgo 编译并运行基准测试，报告相对 O2 的加速比")
+    parser.add_argument("--no-pch", action="store_true", help="C++ 不使用预编译头")
+    parser.add_argument("--no-test-pack", action="store_true", help="不使用二进制测试包，每次重新解析测试文件")
+    parser.add_argument("--pack-compress", action="store_true", help="测试包中的用例内容使用 zlib 压缩")
+    parser.add_argument("--no-cgroup", action="store_true", help="不使用 cgroup v2 隔离，只用 rlimit 限制资源")
+    parser.add_argument("--pin-cpus", action="store_true", help="每个并发任务独占一个物理核心（避开超线程兄弟），并发数不超过核心数")
+    parser.add_argument("--reserve-core", action="store_true", help="绑定 CPU 时为评测器自身保留一个核心（隐含 --pin-cpus）")
+    parser.add_argument("--compare-parallel", action="store_true", help="分别串行和以 --jobs 并发运行基准测试，比较每个用例的耗时是否一致")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="并发执行测试用例的线程数，0 表示使用全部CPU核心 (默认: 1)")
+    parser.add_argument("--cache-size", type=int, default=512, help="编译缓存容量上限(MB)，0 表示禁用缓存 (默认: 512)")
+    parser.add_argument("--problem-jobs", "-J", type=int, default=1, help="--all 时同时评测的问题数，0 表示使用全部CPU核心 (默认: 1)")
+    parser.add_argument("--bench", action="store_true", help="基准测试模式：重复运行每个用例并统计耗时")
+    parser.add_argument("--warmup", type=int, default=1, help="基准测试中每个用例的预热次数 (默认: 1)")
+    parser.add_argument("--repeat", type=int, help="基准测试中每个用例的计时次数 (默认: 5；--complexity 中为每个规模的运行次数，默认: 3)")
+    parser.add_argument("--save-baseline", nargs="?", const=".oj/baseline.json", metavar="FILE",
+                        help="以基准测试方式运行并把中位耗时和峰值内存保存为基线 (默认: .oj/baseline.json)")
+    parser.add_argument("--compare-baseline", nargs="?", const=".oj/baseline.json", metavar="FILE",
+                        help="以基准测试方式运行并与基线比较，有退化或基线中没有记录时以非零状态退出 (默认: .oj/baseline.json)")
+    parser.add_argument("--allow-missing-baseline", action="store_true",
+                        help="--compare-baseline 时基线文件或其中的问题/语言记录不存在只给出警告，不视为失败")
+    parser.add_argument("--threshold", type=float, default=10, help="与基线比较时允许的增幅(百分比) (默认: 10)")
+    parser.add_argument("--history", action="store_true", help="显示 --problem 指定问题的历史耗时（配合 --case 查看单个用例）")
+    parser.add_argument("--slowest", type=int, metavar="N", help="按最近一次耗时列出最慢的 N 个用例（可用 --problem 限定问题）")
+    parser.add_argument("--limit", type=int, default=20, help="--history 显示的最大记录数 (默认: 20)")
+    parser.add_argument("--no-history", action="store_true", help="不把本次运行结果写入历史记录")
+    parser.add_argument("--watch", "-w", action="store_true", help="监视模式：源码或测试文件变化时自动重新编译并运行（配合 --problem 只监视一个问题）")
+    parser.add_argument("--no-result-cache", action="store_true", help="不复用上次通过的评测结果，重新运行所有用例")
+    parser.add_argument("--rerun-failed", action="store_true", help="只运行上次失败的测试用例")
+    parser.add_argument("--stress", type=int, metavar="N", help="对拍：用问题目录下的 gen 生成 N 组随机数据，与 brute 的输出比较")
+    parser.add_argument("--seed", type=int, help="对拍的起始随机种子（默认随机选择；--complexity 默认为 1）")
+    parser.add_argument("--complexity", action="store_true", help="复杂度分析：用 gen 生成规模递增的输入，拟合解法的时间复杂度")
+    parser.add_argument("--min-n", type=int, default=1000, help="复杂度分析的起始规模 (默认: 1000)")
+    parser.add_argument("--max-n", type=int, default=10 ** 8, help="复杂度分析的最大规模 (默认: 100000000)")
+    parser.add_argument("--growth", type=float, default=2.0, help="复杂度分析中规模的增长倍数 (默认: 2)")
     parser.add_argument("--list", action="store_true", help="列出所有可用的问题")
     parser.add_argument("--new", "-n", help="创建新问题（指定问题名称，如: p0004）")
     parser.add_argument("--env", action="store_true", help="显示环境信息")
+    parser.add_argument("--compile", action="store_true", help="只编译解法，不运行测试（配合 --problem 或 --all）")
+    parser.add_argument("--daemon", action="store_true", help="启动常驻评测服务，之后的命令自动转发给它执行")
+    parser.add_argument("--stop-daemon", action="store_true", help="停止常驻评测服务")
+    parser.add_argument("--no-daemon", action="store_true", help="不使用评测服务，在本地运行本次命令")
     
-    args = parser.parse_args()
-    
-    tester = OJTester(use_wsl=args.wsl, timeout=args.timeout)
+    args = parser.parse_args(argv)
+
+    if testers is None:
+        if args.daemon:
+            sys.exit(0 if OJDaemon().serve() else 1)
+        if args.stop_daemon:
+            if OJDaemon.stop():
+                print(f"{Colors.GREEN}✓ 已停止评测服务{Colors.END}")
+            else:
+                print(f"{Colors.BLUE}ℹ 评测服务未运行{Colors.END}")
+            return
+    elif args.daemon or args.stop_daemon or args.watch:
+        parser.error("评测服务中不能执行 --daemon、--stop-daemon 或 --watch")
+
+    options = dict(use_wsl=args.wsl, timeout=args.timeout, jobs=args.jobs,
+                   problem_jobs=args.problem_jobs, cache_size_mb=args.cache_size,
+                   memory_limit=args.memory_limit, fork_server=not args.no_fork_server,
+                   history=not args.no_history,
+                   result_cache=not args.no_result_cache, rerun_failed=args.rerun_failed,
+                   build_profile=args.profile, pch=not args.no_pch,
+                   test_pack=not args.no_test_pack, pack_compress=args.pack_compress,
+                   cgroup=not args.no_cgroup, pin_cpus=args.pin_cpus, reserve_core=args.reserve_core,
+                   output_limit=args.output_limit)
+    if testers is None:
+        tester = OJTester(**options)
+    else:
+        # 编译器和解释器按 PATH 查找，PATH 不同的客户端使用各自的实例
+        key = (os.getcwd(), os.environ.get('PATH', ''), tuple(sorted(options.items())))
+        tester = testers.get(key)
+        if tester is None:
+            tester = testers[key] = OJTester(**options)
+        else:
+            # 环境变量已换成本次客户端的，重新应用评测器需要的设置
+            tester.setup_environment()
     
     if args.list:
         problems = tester.list_problems()
@@ -671,11 +4724,109 @@ def main():
                 tester.print_info("构建目录不存在")
         return
     
-    if args.all:
-        tester.run_all_problems(args.lang)
-    elif args.problem:
-        success = tester.run_tests(args.problem, args.lang)
+    langs = [lang.strip() for lang in args.lang.split(",") if lang.strip()]
+    if not langs:
+        parser.error("请指定编程语言")
+    try:
+        case_numbers = parse_case_numbers(args.case) if args.case else None
+    except ValueError:
+        parser.error(f"无效的测试用例编号: {args.case}")
+
+    if args.history:
+        if not args.problem:
+            parser.error("--history 需要同时指定 --problem")
+        if case_numbers and len(case_numbers) > 1:
+            parser.error("--history 只能指定一个测试用例")
+        for lang in langs:
+            tester.print_history(args.problem, lang, case_numbers[0] if case_numbers else None, args.limit)
+        return
+    if args.slowest is not None:
+        tester.print_slowest(args.problem, langs, args.slowest)
+        return
+
+    if args.stress is not None:
+        if not args.problem:
+            parser.error("--stress 需要同时指定 --problem")
+        results = [tester.stress_test(args.problem, lang, args.stress, args.seed) for lang in langs]
+        sys.exit(0 if all(results) else 1)
+
+    if args.complexity:
+        if not args.problem:
+            parser.error("--complexity 需要同时指定 --problem")
+        if args.growth <= 1:
+            parser.error("--growth 必须大于 1")
+        results = [tester.complexity_analysis(args.problem, lang, args.min_n, args.max_n, args.growth,
+                                              args.seed if args.seed is not None else 1, args.repeat or 3)
+                   for lang in langs]
+        sys.exit(0 if all(results) else 1)
+
+    if args.compare_parallel:
+        if not args.problem:
+            parser.error("--compare-parallel 需要同时指定 --problem")
+        repeat = args.repeat if args.repeat is not None else 5
+        if repeat < 1 or args.warmup < 0:
+            parser.error("--repeat 至少为 1，--warmup 不能为负数")
+        results = [tester.compare_parallel(args.problem, lang, case_numbers, args.warmup, repeat) for lang in langs]
+        sys.exit(0 if all(results) else 1)
+
+    if args.compare_profiles:
+        if not args.problem:
+            parser.error("--compare-profiles 需要同时指定 --problem")
+        repeat = args.repeat if args.repeat is not None else 5
+        if repeat < 1 or args.warmup < 0:
+            parser.error("--repeat 至少为 1，--warmup 不能为负数")
+        results = [tester.compare_profiles(args.problem, lang, case_numbers, args.warmup, repeat) for lang in langs]
+        sys.exit(0 if all(results) else 1)
+
+    if args.compile:
+        if not (args.all or args.problem):
+            parser.error("--compile 需要同时指定 --problem 或 --all")
+        problems = tester.list_problems() if args.all else [args.problem]
+        results = []
+        for problem in problems:
+            for lang in langs:
+                executable = tester.compile_solution(problem, lang)
+                if executable is not None:
+                    tester.print_success(f"{problem} ({lang}) 编译完成: {executable}")
+                results.append(executable is not None)
+        sys.exit(0 if all(results) else 1)
+
+    if args.watch:
+        if args.problem and not (tester.problems_dir / args.problem).is_dir():
+            parser.error(f"问题不存在: {args.problem}")
+        tester.watch([args.problem] if args.problem else None, langs)
+        return
+
+    baseline_mode = args.save_baseline or args.compare_baseline
+    if (args.bench or baseline_mode) and (args.all or args.problem):
+        repeat = args.repeat if args.repeat is not None else 5
+        if repeat < 1 or args.warmup < 0:
+            parser.error("--repeat 至少为 1，--warmup 不能为负数")
+        baseline = None
+        if args.compare_baseline:
+            if not Path(args.compare_baseline).is_file() and not args.allow_missing_baseline:
+                parser.error(f"基线文件不存在: {args.compare_baseline} (可加上 --allow-missing-baseline 跳过比较)")
+            try:
+                baseline = tester.load_baseline(Path(args.compare_baseline))
+            except (OSError, ValueError) as e:
+                parser.error(f"无法读取基线文件: {e}")
+        problems = tester.list_problems() if args.all else [args.problem]
+        success, reports = tester.run_benchmarks(problems, langs, case_numbers, args.warmup, repeat)
+        if baseline is not None:
+            for problem, lang_reports in reports.items():
+                for lang, report in lang_reports.items():
+                    if not tester.compare_with_baseline(baseline, problem, lang, report, args.threshold / 100,
+                                                        args.allow_missing_baseline):
+                        success = False
+        if args.save_baseline:
+            tester.save_baseline(Path(args.save_baseline), reports)
         sys.exit(0 if success else 1)
+    elif args.all:
+        results = [tester.run_all_problems(lang) for lang in langs]
+        sys.exit(0 if all(results) else 1)
+    elif args.problem:
+        results = [tester.run_tests(args.problem, lang, case_numbers) for lang in langs]
+        sys.exit(0 if all(results) else 1)
     else:
         parser.print_help()
         # 如果没有参数，列出可用问题
@@ -13,11 +13,15 @@ from pathlib import Path
 import urllib.request
 import zipfile
 
+from oj import CompilerDetector
+
 class EnvironmentSetup:
     def __init__(self):
         self.is_windows = platform.system() == "Windows"
         self.is_linux = platform.system() == "Linux"
         self.is_macos = platform.system() == "Darwin"
+        # 与 oj.py 共用编译器探测逻辑和磁盘缓存
+        self.compiler_detector = CompilerDetector(Path(__file__).parent / "build" / ".compilers.json")
 
     def print_info(self, text: str):
         """打印信息"""
@@ -73,11 +77,13 @@ class EnvironmentSetup:
         }
 
         results = {}
+        # 并行探测，结果按 PATH 和编译器修改时间缓存
+        outputs = self.compiler_detector.probe_all(compilers)
 
-        for name, cmd in compilers.items():
-            success, stdout, stderr = self.run_command(cmd, check_returncode=False)
-            if success:
-                version = stdout.split('\n')[0] if stdout else "未知版本"
+        for name in compilers:
+            output = outputs[name]
+            if output is not None:
+                version = output.split('\n')[0] if output else "未知版本"
                 self.print_success(f"{name}编译器: {version}")
                 results[name] = True
             else: